@@ -12,7 +12,7 @@ cursor = conn.cursor()
 cursor.execute('''
     CREATE TABLE IF NOT EXISTS state (
         chatid TEXT,
-        workflow TEXT,
+        workflow BLOB,
         version TEXT,
         timestamp TEXT
     )
@@ -1,13 +1,14 @@
 import os
 import json
+import time
 import sqlite3
-from datetime import datetime
 from typing import TypedDict, Dict, List, Any
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
+from workflow_codec import encode_workflow
 
 # Load environment variables
 load_dotenv()
@@ -759,7 +760,11 @@ Include all necessary form fields based on user answers. Return ONLY valid JSON.
         
         try:
             with open(filepath, 'w') as f:
-                json.dump(master_json, f, indent=2)
+                # Compact like the state table copy; AKIRA_PRETTY=1 indents it for debugging
+                if os.getenv("AKIRA_PRETTY"):
+                    json.dump(master_json, f, indent=2)
+                else:
+                    json.dump(master_json, f, separators=(",", ":"))
             print(f"\n[SAVE] Master JSON saved to: {filepath}")
             
             # Database Insertion: Log the generated workflow state
@@ -768,13 +773,13 @@ Include all necessary form fields based on user answers. Return ONLY valid JSON.
                 conn = sqlite3.connect(db_path)
                 cursor = conn.cursor()
                 
-                workflow_json = json.dumps(master_json)
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                workflow_blob = encode_workflow(master_json)
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
                 
                 cursor.execute('''
                     INSERT INTO state (chatid, workflow, version, timestamp)
                     VALUES (?, ?, ?, ?)
-                ''', (chat_id, workflow_json, "0", timestamp))
+                ''', (chat_id, workflow_blob, "0", timestamp))
                 
                 conn.commit()
                 conn.close()
@@ -1,26 +1,126 @@
-from flask import Flask, render_template, request, redirect, url_for, Response, stream_with_context
+from flask import Flask, render_template, request, redirect, url_for, Response, stream_with_context, send_file, stream_template
 import sqlite3
 import uuid
-import datetime
+import time
 import os
 import json
+import threading
 from agent import WorkflowAgent
-from mod_agent import WorkflowModificationAgent
+from workflow_codec import decode_workflow, workflow_text
 
 # Initialize the agents
 agent = WorkflowAgent()
-mod_agent = WorkflowModificationAgent()
+
+# The modification agent (and its sqlite checkpointer) is only needed once a chat has a
+# workflow, so it is imported and built on first use instead of at startup
+_mod_agent = None
+_mod_agent_lock = threading.Lock()
+
+def get_mod_agent():
+    global _mod_agent
+    if _mod_agent is None:
+        with _mod_agent_lock:
+            if _mod_agent is None:
+                from mod_agent import WorkflowModificationAgent
+                _mod_agent = WorkflowModificationAgent()
+    return _mod_agent
 
 app = Flask(__name__)
 DB_PATH = os.path.join(os.path.dirname(__file__), 'database')
 WORKFLOWS_DIR = os.path.join(os.path.dirname(__file__), 'workflows')
 os.makedirs(WORKFLOWS_DIR, exist_ok=True)
 
+# SQL statements live at module level so every connection's statement cache reuses the compiled plans
+Q_INSERT_MESSAGE = 'INSERT INTO chatlog (chatid, message, timestamp, sender, workflow_generated) VALUES (?, ?, ?, ?, ?)'
+
+# Insert the system reply and read back the latest stored workflow in one round trip
+Q_INSERT_SYSTEM_MESSAGE = '''
+    INSERT INTO chatlog (chatid, message, timestamp, sender, workflow_generated)
+    VALUES (?, ?, ?, ?, ?)
+    RETURNING workflow_generated, (
+        SELECT workflow
+        FROM state
+        WHERE chatid = chatlog.chatid
+        ORDER BY CAST(version AS INTEGER) DESC
+        LIMIT 1
+    ) AS workflow
+'''
+
+# Get the latest message for each chatid and the corresponding workflow name if it exists
+Q_INDEX = '''
+    SELECT c1.chatid, substr(c1.message, 1, 120) AS preview_raw,
+           length(c1.message) > 120 AS preview_truncated, s.workflow
+    FROM chatlog c1
+    JOIN (
+        SELECT MAX(rowid) as max_rowid
+        FROM chatlog
+        GROUP BY chatid
+    ) c2 ON c1.rowid = c2.max_rowid
+    LEFT JOIN (
+        SELECT chatid, workflow
+        FROM state
+        WHERE (chatid, CAST(version AS INTEGER)) IN (
+            SELECT chatid, MAX(CAST(version AS INTEGER))
+            FROM state
+            GROUP BY chatid
+        )
+    ) s ON c1.chatid = s.chatid
+    ORDER BY c1.rowid DESC
+'''
+
+# chatlog rows are appended in order, so rowid doubles as a cheap integer sort key
+Q_CHAT_MESSAGES = 'SELECT * FROM chatlog WHERE chatid = ? ORDER BY rowid'
+
+Q_LAST_USER_MESSAGE = "SELECT message, workflow_generated FROM chatlog WHERE chatid = ? AND sender = 'User' ORDER BY rowid DESC LIMIT 1"
+
+Q_LATEST_WF = '''
+    SELECT workflow FROM state 
+    WHERE chatid = ? 
+    ORDER BY CAST(version AS INTEGER) DESC 
+    LIMIT 1
+'''
+
+Q_MAX_VERSION = 'SELECT MAX(CAST(version AS INTEGER)) FROM state WHERE chatid = ?'
+
+# Build the JSON array in SQLite so the rows never become Python objects
+Q_VERSIONS = '''
+    SELECT json_group_array(version) FROM (
+        SELECT version FROM state WHERE chatid = ? ORDER BY CAST(version AS INTEGER) ASC
+    )
+'''
+
+Q_WF_BY_VERSION = 'SELECT workflow FROM state WHERE chatid = ? AND version = ?'
+
+Q_TRUNCATE_VERSIONS = 'DELETE FROM state WHERE chatid = ? AND CAST(version AS INTEGER) > ?'
+
+Q_DELETE_CHATLOG = 'DELETE FROM chatlog WHERE chatid = ?'
+
+Q_DELETE_STATE = 'DELETE FROM state WHERE chatid = ?'
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, cached_statements=256)
     conn.row_factory = sqlite3.Row
     return conn
 
+_last_timestamp = (0, "")
+
+def now_timestamp():
+    # Format the current time once per second; streams emit many events within the same second
+    global _last_timestamp
+    now = int(time.time())
+    if now != _last_timestamp[0]:
+        _last_timestamp = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+    return _last_timestamp[1]
+
+def write_workflow_file(filepath, workflow_json):
+    # Write to a temp file and swap it in so readers never see a torn file
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(workflow_json)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
@@ -29,74 +129,69 @@ def index():
         
         # Insert initial greeting
         conn = get_db_connection()
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Check if workflow exists
-        workflow_exists = os.path.exists(os.path.join(WORKFLOWS_DIR, f"{new_chat_id}.json"))
+        timestamp = now_timestamp()
         
-        conn.execute('INSERT INTO chatlog (chatid, message, timestamp, sender, workflow_generated) VALUES (?, ?, ?, ?, ?)',
-                     (new_chat_id, "what are we building today?", timestamp, 'System', workflow_exists))
+        # A freshly generated chat id has no workflow file yet
+        conn.execute(Q_INSERT_MESSAGE,
+                     (new_chat_id, "what are we building today?", timestamp, 'System', False))
         conn.commit()
         conn.close()
         
         return redirect(url_for('chat_route', chat_id=new_chat_id))
     
     conn = get_db_connection()
-    # Get the latest message for each chatid and the corresponding workflow name if it exists
-    query = '''
-        SELECT c1.chatid, c1.message, s.workflow
-        FROM chatlog c1
-        JOIN (
-            SELECT chatid, MAX(timestamp) as max_ts
-            FROM chatlog
-            GROUP BY chatid
-        ) c2 ON c1.chatid = c2.chatid AND c1.timestamp = c2.max_ts
-        LEFT JOIN (
-            SELECT chatid, workflow
-            FROM state
-            WHERE (chatid, CAST(version AS INTEGER)) IN (
-                SELECT chatid, MAX(CAST(version AS INTEGER))
-                FROM state
-                GROUP BY chatid
-            )
-        ) s ON c1.chatid = s.chatid
-        ORDER BY c1.timestamp DESC
-    '''
-    chats_raw = conn.execute(query).fetchall()
-    conn.close()
+    cursor = conn.execute(Q_INDEX)
+    first_batch = cursor.fetchmany(64)
+    if not first_batch:
+        conn.close()
+        return render_template('index.html', chats=[])
+
+    def chat_iter():
+        # Render rows as they are fetched so memory stays flat regardless of chat count
+        try:
+            batch = first_batch
+            while batch:
+                for chat in batch:
+                    yield build_chat_entry(chat)
+                batch = cursor.fetchmany(64)
+        finally:
+            conn.close()
+
+    return stream_template('index.html', chats=chat_iter())
+
+def build_chat_entry(chat):
+    chat_name = None
+    if chat['workflow']:
+        try:
+            wf_data = decode_workflow(chat['workflow'])
+            chat_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
+        except:
+            pass
     
-    chats = []
-    for chat in chats_raw:
-        chat_name = None
-        if chat['workflow']:
-            try:
-                wf_data = json.loads(chat['workflow'])
-                chat_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
-            except:
-                pass
-        
-        if not chat_name:
-            msg = chat['message'] or ""
-            words = msg.split()
-            chat_name = " ".join(words[:10]) + ("..." if len(words) > 10 else "")
-            
-        chats.append({
-            'chatid': chat['chatid'],
-            'preview': chat_name or f"Chat {chat['chatid'][:8]}"
-        })
+    if not chat_name:
+        # The message is already truncated to 120 chars by SQLite
+        words = (chat['preview_raw'] or "").split()
+        chat_name = " ".join(words[:10]) + ("..." if len(words) > 10 or chat['preview_truncated'] else "")
         
-    return render_template('index.html', chats=chats)
+    return {
+        'chatid': chat['chatid'],
+        'preview': chat_name or f"Chat {chat['chatid'][:8]}"
+    }
 
 @app.route('/delete/<chat_id>', methods=['POST'])
 def delete_chat(chat_id):
     conn = get_db_connection()
     try:
         # 1. Delete from chatlog
-        conn.execute('DELETE FROM chatlog WHERE chatid = ?', (chat_id,))
+        conn.execute(Q_DELETE_CHATLOG, (chat_id,))
         # 2. Delete from state
-        conn.execute('DELETE FROM state WHERE chatid = ?', (chat_id,))
+        had_workflow = conn.execute(Q_DELETE_STATE, (chat_id,)).rowcount > 0
         conn.commit()
         
+        # Only chats with a workflow can have modification-agent threads
+        if had_workflow:
+            get_mod_agent().forget_thread(chat_id)
+        
         # 3. Delete workflow JSON file
         filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
         if os.path.exists(filepath):
@@ -123,12 +218,12 @@ def chat_route(chat_id):
             message = request.form.get('message', '')
             
         sender = 'User'
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = now_timestamp()
         
         # Check if workflow exists
         workflow_exists = os.path.exists(os.path.join(WORKFLOWS_DIR, f"{chat_id}.json"))
         
-        conn.execute('INSERT INTO chatlog (chatid, message, timestamp, sender, workflow_generated) VALUES (?, ?, ?, ?, ?)',
+        conn.execute(Q_INSERT_MESSAGE,
                      (chat_id, message, timestamp, sender, workflow_exists))
         conn.commit()
         conn.close()
@@ -137,7 +232,7 @@ def chat_route(chat_id):
             return {'status': 'success'}
         return redirect(url_for('chat_route', chat_id=chat_id))
         
-    messages = conn.execute('SELECT * FROM chatlog WHERE chatid = ? ORDER BY timestamp', (chat_id,)).fetchall()
+    messages = conn.execute(Q_CHAT_MESSAGES, (chat_id,)).fetchall()
     
     # Check if header button should be shown (latest message has workflow_generated=1)
     show_header_btn = False
@@ -148,23 +243,18 @@ def chat_route(chat_id):
         show_header_btn = bool(latest_msg['workflow_generated'])
         
         # Fetch workflow name if it exists
-        wf_row = conn.execute('''
-            SELECT workflow FROM state 
-            WHERE chatid = ? 
-            ORDER BY CAST(version AS INTEGER) DESC 
-            LIMIT 1
-        ''', (chat_id,)).fetchone()
+        wf_row = conn.execute(Q_LATEST_WF, (chat_id,)).fetchone()
         
         if wf_row:
             try:
-                wf_data = json.loads(wf_row['workflow'])
+                wf_data = decode_workflow(wf_row['workflow'])
                 workflow_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name') or "Chat Session"
             except:
                 pass
 
         if show_header_btn:
             # Fetch max version from state table
-            version_row = conn.execute('SELECT MAX(CAST(version AS INTEGER)) FROM state WHERE chatid = ?', (chat_id,)).fetchone()
+            version_row = conn.execute(Q_MAX_VERSION, (chat_id,)).fetchone()
             if version_row and version_row[0] is not None:
                 max_version = version_row[0]
         
@@ -176,7 +266,7 @@ def chat_route(chat_id):
 def stream(chat_id):
     # Get the last user message and the latest workflow status to process
     conn = get_db_connection()
-    last_msg_data = conn.execute('SELECT message, workflow_generated FROM chatlog WHERE chatid = ? AND sender = "User" ORDER BY timestamp DESC LIMIT 1', (chat_id,)).fetchone()
+    last_msg_data = conn.execute(Q_LAST_USER_MESSAGE, (chat_id,)).fetchone()
     conn.close()
     
     if not last_msg_data:
@@ -186,33 +276,37 @@ def stream(chat_id):
     is_workflow_generated = bool(last_msg_data['workflow_generated'])
 
     def generate():
+        # One connection for the whole stream instead of opening one per final event
+        conn_sys = get_db_connection()
         try:
             # Select agent based on workflow status
             if is_workflow_generated:
                 print(f"[LOG] Switching to Modification Agent for chat: {chat_id}")
                 filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
-                original_workflow = None
-                if os.path.exists(filepath):
+                # Open directly instead of stat-then-open
+                try:
                     with open(filepath, 'r') as f:
-                        original_workflow = json.load(f)
+                        original_workflow = decode_workflow(f.read())
+                except FileNotFoundError:
+                    original_workflow = None
                 
-                for update in mod_agent.run_step_stream(user_message, chat_id, original_workflow):
+                for update in get_mod_agent().run_step_stream(user_message, chat_id, original_workflow):
                     if isinstance(update, str):
                         yield f"data: {json.dumps({'type': 'log', 'content': update})}\n\n"
+                    elif isinstance(update, dict) and "token" in update:
+                        yield f"data: {json.dumps({'type': 'token', 'content': update['token'], 'node': update.get('node')})}\n\n"
                     elif isinstance(update, dict) and "final_message" in update:
                         response_text = update['final_message']
-                        sys_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        sys_timestamp = now_timestamp()
                         
-                        conn_sys = get_db_connection()
                         # Check if workflow exists and get its name
                         workflow_name = None
-                        if os.path.exists(filepath):
-                            try:
-                                with open(filepath, 'r') as f:
-                                    wf_data = json.load(f)
-                                    workflow_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
-                            except:
-                                pass
+                        try:
+                            with open(filepath, 'r') as f:
+                                wf_data = decode_workflow(f.read())
+                                workflow_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
+                        except:
+                            pass
                         
                         yield f"data: {json.dumps({'type': 'final', 'content': response_text, 'timestamp': sys_timestamp, 'workflow_generated': bool(workflow_name), 'workflow_name': workflow_name})}\n\n"
             else:
@@ -222,29 +316,28 @@ def stream(chat_id):
                         yield f"data: {json.dumps({'type': 'log', 'content': update})}\n\n"
                     elif isinstance(update, dict) and "final_message" in update:
                         response_text = update['final_message']
-                        sys_timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        sys_timestamp = now_timestamp()
                         
-                        conn_sys = get_db_connection()
                         filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
                         workflow_exists = os.path.exists(filepath)
-                        conn_sys.execute('INSERT INTO chatlog (chatid, message, timestamp, sender, workflow_generated) VALUES (?, ?, ?, ?, ?)',
-                                     (chat_id, response_text, sys_timestamp, 'System', workflow_exists))
+                        row = conn_sys.execute(Q_INSERT_SYSTEM_MESSAGE,
+                                               (chat_id, response_text, sys_timestamp, 'System', workflow_exists)).fetchone()
                         conn_sys.commit()
-                        conn_sys.close()
 
-                        # Get workflow name
+                        workflow_exists = bool(row['workflow_generated'])
                         workflow_name = None
-                        if workflow_exists:
+                        if workflow_exists and row['workflow']:
                             try:
-                                with open(filepath, 'r') as f:
-                                    wf_data = json.load(f)
-                                    workflow_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
+                                wf_data = decode_workflow(row['workflow'])
+                                workflow_name = wf_data.get('metadata', {}).get('workflow_name') or wf_data.get('workflow_name')
                             except:
                                 pass
 
                         yield f"data: {json.dumps({'type': 'final', 'content': response_text, 'timestamp': sys_timestamp, 'workflow_generated': workflow_exists, 'workflow_name': workflow_name})}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+        finally:
+            conn_sys.close()
 
     return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
@@ -252,17 +345,16 @@ def stream(chat_id):
 def get_json(chat_id):
     filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
     if os.path.exists(filepath):
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        return json.dumps(data)
+        # Serve the file as-is; no need to parse it server-side
+        return send_file(filepath, mimetype='application/json', conditional=True)
     return {'error': 'File not found'}, 404
 
 @app.route('/get_versions/<chat_id>')
 def get_versions(chat_id):
     conn = get_db_connection()
-    versions = conn.execute('SELECT version FROM state WHERE chatid = ? ORDER BY CAST(version AS INTEGER) ASC', (chat_id,)).fetchall()
+    row = conn.execute(Q_VERSIONS, (chat_id,)).fetchone()
     conn.close()
-    return {'versions': [v['version'] for v in versions]}
+    return Response(f'{{"versions": {row[0]}}}', mimetype='application/json')
 
 @app.route('/select_version', methods=['POST'])
 def select_version():
@@ -272,22 +364,19 @@ def select_version():
     
     conn = get_db_connection()
     # Get the workflow JSON for the selected version
-    wf_row = conn.execute('SELECT workflow FROM state WHERE chatid = ? AND version = ?', (chat_id, str(version))).fetchone()
+    wf_row = conn.execute(Q_WF_BY_VERSION, (chat_id, str(version))).fetchone()
     
     if wf_row:
-        workflow_json = wf_row['workflow']
+        workflow_json = workflow_text(wf_row['workflow'])
         # Overwrite the file
         filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
         try:
-            with open(filepath, 'w') as f:
-                f.write(workflow_json)
+            write_workflow_file(filepath, workflow_json)
             
             # Linear Versioning: Truncate any history "ahead" of the selected version
             # This makes the selected version the new 'head'
-            conn.execute('DELETE FROM state WHERE chatid = ? AND CAST(version AS INTEGER) > ?', 
-                         (chat_id, int(version)))
-            
-            conn.commit()
+            with conn:
+                conn.execute(Q_TRUNCATE_VERSIONS, (chat_id, int(version)))
             conn.close()
             print(f"[DB] History truncated to version {version} for chat: {chat_id}")
             return {'status': 'success', 'current_version': version}
@@ -1,8 +1,57 @@
 import json
-import uuid
-from typing import Dict, Any, List
+import mmap
+import os
+import sys
+import binascii
+from functools import lru_cache
+from typing import Dict, Any, List, Iterator, NamedTuple, Optional, Tuple
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+# Connector host blocks are identical for every action of the same type. Actions get
+# their own copy (dict(...)) so callers can edit a returned flow safely.
+_FORMS_WEBHOOK_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_microsoftforms",
+    "connectionName": "shared_microsoftforms",
+    "operationId": "CreateFormWebhook"
+}
+_FORMS_GET_RESPONSE_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_microsoftforms",
+    "connectionName": "shared_microsoftforms",
+    "operationId": "GetResponseById"
+}
+_EXCEL_POST_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_excelonlinebusiness",
+    "connectionName": "shared_excelonlinebusiness",
+    "operationId": "PostItem"
+}
+_EXCEL_PATCH_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_excelonlinebusiness",
+    "connectionName": "shared_excelonlinebusiness",
+    "operationId": "PatchItem"
+}
+_APPROVAL_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_approvals",
+    "connectionName": "shared_approvals",
+    "operationId": "CreateApproval"
+}
+_EMAIL_HOST = {
+    "apiId": "/providers/Microsoft.PowerApps/apis/shared_office365",
+    "connectionName": "shared_office365",
+    "operationId": "SendEmailV2"
+}
+
+# Literals repeated across every action
+_AUTH = "@parameters('$authentication')"
+_UTC_NOW = "@utcNow()"
+_DRIVE_PLACEHOLDER = "{DRIVE_ID_PLACEHOLDER}"
+_FILE_PLACEHOLDER = "{FILE_ID_PLACEHOLDER}"
+_SUBMITTER_EMAIL = "@body('Get_response_details')?['r2']?['response']"
+
 # ============================================================================
 # CORRECTED POWER AUTOMATE REST API CONVERTER
 # ============================================================================
@@ -23,8 +72,10 @@ def generate_flow_definition_for_rest_api(master_json: Dict[str, Any]) -> Dict[s
     excel_schema = master_json.get("excel_tracker", {})
     approval_chain = master_json.get("workflow_analysis", {}).get("approval_chain", [])
     
-    # Build connection references
+    # Build each sub-tree once; the definition below only references them
     connection_refs = build_connection_references_rest_api(workflow)
+    triggers = build_triggers_rest_api(workflow, form_schema)
+    actions = build_actions_rest_api(workflow, form_schema, excel_schema, approval_chain)
     
     # Build the flow definition
     flow_definition = {
@@ -45,8 +96,8 @@ def generate_flow_definition_for_rest_api(master_json: Dict[str, Any]) -> Dict[s
                         "type": "SecureObject"
                     }
                 },
-                "triggers": build_triggers_rest_api(workflow, form_schema),
-                "actions": build_actions_rest_api(workflow, form_schema, excel_schema, approval_chain),
+                "triggers": triggers,
+                "actions": actions,
                 "outputs": {}
             },
             "connectionReferences": connection_refs,
@@ -66,15 +117,9 @@ def build_connection_references_rest_api(workflow: Dict[str, Any]) -> Dict[str,
     connectors_used = set()
     
     for step in workflow.get("steps", []):
-        connector = step.get("connector", "")
-        if "Microsoft Forms" in connector:
-            connectors_used.add("shared_microsoftforms")
-        elif "Excel" in connector:
-            connectors_used.add("shared_excelonlinebusiness")
-        elif "Teams" in connector or "Approvals" in connector:
-            connectors_used.add("shared_approvals")
-        elif "Outlook" in connector:
-            connectors_used.add("shared_office365")
+        connector_id = _connector_id(step.get("connector", ""))
+        if connector_id:
+            connectors_used.add(connector_id)
     
     # Build connection references
     connection_refs = {}
@@ -93,6 +138,25 @@ def build_connection_references_rest_api(workflow: Dict[str, Any]) -> Dict[str,
     return connection_refs
 
 
+# Checked in order; the first pattern found in the step's connector name wins
+_CONNECTOR_PATTERNS = (
+    ("Microsoft Forms", "shared_microsoftforms"),
+    ("Excel", "shared_excelonlinebusiness"),
+    ("Teams", "shared_approvals"),
+    ("Approvals", "shared_approvals"),
+    ("Outlook", "shared_office365"),
+)
+
+
+@lru_cache(maxsize=256)
+def _connector_id(connector: str) -> Optional[str]:
+    """Map a connector name to its API id; steps repeat a handful of names so results are cached"""
+    for pattern, connector_id in _CONNECTOR_PATTERNS:
+        if pattern in connector:
+            return connector_id
+    return None
+
+
 def build_triggers_rest_api(workflow: Dict[str, Any], form_schema: Dict[str, Any]) -> Dict[str, Any]:
     """
     Build trigger definition (Microsoft Forms trigger)
@@ -104,18 +168,14 @@ def build_triggers_rest_api(workflow: Dict[str, Any], form_schema: Dict[str, Any
         "When_a_new_response_is_submitted": {
             "type": "OpenApiConnection",
             "inputs": {
-                "host": {
-                    "apiId": "/providers/Microsoft.PowerApps/apis/shared_microsoftforms",
-                    "connectionName": "shared_microsoftforms",
-                    "operationId": "CreateFormWebhook"
-                },
+                "host": dict(_FORMS_WEBHOOK_HOST),
                 "parameters": {
                     "form_id": "{FORM_ID_PLACEHOLDER}"
                 },
-                "authentication": "@parameters('$authentication')"
+                "authentication": _AUTH
             },
             "metadata": {
-                "operationMetadataId": str(uuid.uuid4())
+                "operationMetadataId": _opid()
             }
         }
     }
@@ -130,30 +190,43 @@ def build_actions_rest_api(
     """
     Build all workflow actions in Power Automate format
     """
+    return dict(_iter_actions(workflow, form_schema, excel_schema, approval_chain))
+
+
+def _iter_actions(
+    workflow: Dict[str, Any],
+    form_schema: Dict[str, Any],
+    excel_schema: Dict[str, Any],
+    approval_chain: List[Dict[str, Any]]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (name, action) pairs in run order"""
+    
+    # 4 fixed actions + 4 per approver + final email, each with one metadata id
+    op_ids = _operation_ids(4 * len(approval_chain) + 5)
+    
+    # Schema reads used by several actions, looked up once
+    questions = form_schema.get("questions", [])
+    table_name = excel_schema.get("table_name", "{TABLE_NAME}")
+    confirmation_subject = f"{workflow.get('name', 'Workflow')} - Submission Received"
     
-    actions = {}
     previous_action = None
     action_counter = 1
     
     # Get form response details
     action_name = "Get_response_details"
-    actions[action_name] = {
+    yield action_name, {
         "type": "OpenApiConnection",
         "inputs": {
-            "host": {
-                "apiId": "/providers/Microsoft.PowerApps/apis/shared_microsoftforms",
-                "connectionName": "shared_microsoftforms",
-                "operationId": "GetResponseById"
-            },
+            "host": dict(_FORMS_GET_RESPONSE_HOST),
             "parameters": {
                 "form_id": "{FORM_ID_PLACEHOLDER}",
                 "response_id": "@triggerBody()?['resourceData']?['responseId']"
             },
-            "authentication": "@parameters('$authentication')"
+            "authentication": _AUTH
         },
         "runAfter": {},
         "metadata": {
-            "operationMetadataId": str(uuid.uuid4())
+            "operationMetadataId": next(op_ids)
         }
     }
     previous_action = action_name
@@ -161,7 +234,7 @@ def build_actions_rest_api(
     
     # Initialize variables
     action_name = "Initialize_SubmissionID"
-    actions[action_name] = {
+    yield action_name, {
         "type": "InitializeVariable",
         "inputs": {
             "variables": [
@@ -176,7 +249,7 @@ def build_actions_rest_api(
             previous_action: ["Succeeded"]
         },
         "metadata": {
-            "operationMetadataId": str(uuid.uuid4())
+            "operationMetadataId": next(op_ids)
         }
     }
     previous_action = action_name
@@ -188,37 +261,35 @@ def build_actions_rest_api(
     # Build Excel row data from form fields
     excel_row = {
         "SubmissionID": "@variables('SubmissionID')",
-        "SubmissionTimestamp": "@utcNow()",
+        "SubmissionTimestamp": _UTC_NOW,
         "CurrentStatus": "Submitted"
     }
     
     # Add form field values
-    for question in form_schema.get("questions", [])[:5]:
-        field_name = question.get("field_name", "")
-        excel_row[field_name] = f"@{{body('Get_response_details')?['{question.get('id', '')}']?['response']}}"
+    q_pairs = [(q.get("field_name", ""), q.get("id", "")) for q in questions[:5]]
+    excel_row.update({
+        field_name: f"@{{body('Get_response_details')?['{qid}']?['response']}}"
+        for field_name, qid in q_pairs
+    })
     
-    actions[action_name] = {
+    yield action_name, {
         "type": "OpenApiConnection",
         "inputs": {
-            "host": {
-                "apiId": "/providers/Microsoft.PowerApps/apis/shared_excelonlinebusiness",
-                "connectionName": "shared_excelonlinebusiness",
-                "operationId": "PostItem"
-            },
+            "host": dict(_EXCEL_POST_HOST),
             "parameters": {
                 "source": "SharePoint",
-                "drive": "{DRIVE_ID_PLACEHOLDER}",
-                "file": "{FILE_ID_PLACEHOLDER}",
-                "table": excel_schema.get("table_name", "{TABLE_NAME}"),
+                "drive": _DRIVE_PLACEHOLDER,
+                "file": _FILE_PLACEHOLDER,
+                "table": table_name,
                 "item": excel_row
             },
-            "authentication": "@parameters('$authentication')"
+            "authentication": _AUTH
         },
         "runAfter": {
             previous_action: ["Succeeded"]
         },
         "metadata": {
-            "operationMetadataId": str(uuid.uuid4())
+            "operationMetadataId": next(op_ids)
         }
     }
     previous_action = action_name
@@ -226,119 +297,113 @@ def build_actions_rest_api(
     
     # Send confirmation email
     action_name = "Send_confirmation_email"
-    actions[action_name] = {
+    yield action_name, {
         "type": "OpenApiConnection",
         "inputs": {
-            "host": {
-                "apiId": "/providers/Microsoft.PowerApps/apis/shared_office365",
-                "connectionName": "shared_office365",
-                "operationId": "SendEmailV2"
-            },
+            "host": dict(_EMAIL_HOST),
             "parameters": {
-                "emailMessage/To": "@body('Get_response_details')?['r2']?['response']",
-                "emailMessage/Subject": f"{workflow.get('name', 'Workflow')} - Submission Received",
+                "emailMessage/To": _SUBMITTER_EMAIL,
+                "emailMessage/Subject": confirmation_subject,
                 "emailMessage/Body": "<p>Your request has been submitted successfully.</p>",
                 "emailMessage/Importance": "Normal"
             },
-            "authentication": "@parameters('$authentication')"
+            "authentication": _AUTH
         },
         "runAfter": {
             previous_action: ["Succeeded"]
         },
         "metadata": {
-            "operationMetadataId": str(uuid.uuid4())
+            "operationMetadataId": next(op_ids)
         }
     }
     previous_action = action_name
     action_counter += 1
     
     # Build approval flow
-    for approver in approval_chain:
-        level = approver["level"]
-        role = approver["approver_role"]
-        role_sanitized = role.replace(" ", "_")
-        
+    # field_name -> question index (r1, r2, ...); the first question with a field_name wins
+    field_idx = {}
+    for idx, question in enumerate(questions, 1):
+        field_idx.setdefault(question.get("field_name"), idx)
+    
+    chain_strings = _approval_chain_strings(tuple(a["approver_role"] for a in approval_chain))
+    approvers = [
+        _Approver(level=a["level"], role=a["approver_role"], names=names)
+        for a, names in zip(approval_chain, chain_strings)
+    ]
+    for level, role, names in approvers:
         # Start approval
-        action_name = f"Approval_{role_sanitized}"
+        action_name = names.approval
         
         # Get approver email from form
-        approver_email_field = f"{role.lower().replace(' ', '_')}_email"
+        approver_email_field = names.email_field
         
-        actions[action_name] = {
+        yield action_name, {
             "type": "OpenApiConnection",
             "inputs": {
-                "host": {
-                    "apiId": "/providers/Microsoft.PowerApps/apis/shared_approvals",
-                    "connectionName": "shared_approvals",
-                    "operationId": "CreateApproval"
-                },
+                "host": dict(_APPROVAL_HOST),
                 "parameters": {
                     "approvalType": "Approve/Reject - First to respond",
                     "WebhookApprovalCreationInput/title": f"Approval Required - Level {level}",
-                    "WebhookApprovalCreationInput/assignedTo": f"@{{body('Get_response_details')?['r{find_question_index(form_schema, approver_email_field)}']?['response']}}",
+                    "WebhookApprovalCreationInput/assignedTo": f"@{{body('Get_response_details')?['r{field_idx.get(approver_email_field, 1)}']?['response']}}",
                     "WebhookApprovalCreationInput/details": f"Please review and approve/reject this request.\n\nSubmission ID: @{{variables('SubmissionID')}}",
                     "WebhookApprovalCreationInput/itemLink": "",
                     "WebhookApprovalCreationInput/itemLinkDescription": "View Request",
                     "WebhookApprovalCreationInput/enableReassignment": False,
                     "WebhookApprovalCreationInput/enableComments": True
                 },
-                "authentication": "@parameters('$authentication')"
+                "authentication": _AUTH
             },
             "runAfter": {
                 previous_action: ["Succeeded"]
             },
             "metadata": {
-                "operationMetadataId": str(uuid.uuid4())
+                "operationMetadataId": next(op_ids)
             }
         }
         previous_action = action_name
         action_counter += 1
         
         # Update Excel with approval result
-        action_name = f"Update_Excel_{role_sanitized}"
-        actions[action_name] = {
+        action_name = names.update_excel
+        yield action_name, {
             "type": "OpenApiConnection",
             "inputs": {
-                "host": {
-                    "apiId": "/providers/Microsoft.PowerApps/apis/shared_excelonlinebusiness",
-                    "connectionName": "shared_excelonlinebusiness",
-                    "operationId": "PatchItem"
-                },
+                "host": dict(_EXCEL_PATCH_HOST),
                 "parameters": {
                     "source": "SharePoint",
-                    "drive": "{DRIVE_ID_PLACEHOLDER}",
-                    "file": "{FILE_ID_PLACEHOLDER}",
-                    "table": excel_schema.get("table_name", "{TABLE_NAME}"),
+                    "drive": _DRIVE_PLACEHOLDER,
+                    "file": _FILE_PLACEHOLDER,
+                    "table": table_name,
                     "idColumn": "SubmissionID",
                     "id": "@variables('SubmissionID')",
                     "item": {
-                        f"{role_sanitized}_Status": f"@{{body('Approval_{role_sanitized}')?['outcome']}}",
-                        f"{role_sanitized}_Name": f"@{{body('Approval_{role_sanitized}')?['responder']?['displayName']}}",
-                        f"{role_sanitized}_Timestamp": "@utcNow()",
-                        f"{role_sanitized}_Comments": f"@{{body('Approval_{role_sanitized}')?['comments']}}"
+                        names.status_column: names.outcome_expr,
+                        names.name_column: names.responder_expr,
+                        names.timestamp_column: _UTC_NOW,
+                        names.comments_column: names.comments_expr
                     }
                 },
-                "authentication": "@parameters('$authentication')"
+                "authentication": _AUTH
             },
             "runAfter": {
                 previous_action: ["Succeeded"]
             },
             "metadata": {
-                "operationMetadataId": str(uuid.uuid4())
+                "operationMetadataId": next(op_ids)
             }
         }
         previous_action = action_name
         action_counter += 1
         
         # Check if rejected
-        action_name = f"Condition_Check_Rejection_{role_sanitized}"
-        rejection_action_name = f"Send_Rejection_Email_{role_sanitized}"
+        action_name = names.condition
+        rejection_action_name = names.rejection_email
         
-        actions[action_name] = {
+        yield action_name, {
             "type": "If",
             "expression": {
                 "equals": [
-                    f"@body('Approval_{role_sanitized}')?['outcome']",
+                    names.outcome_ref,
                     "Reject"
                 ]
             },
@@ -346,29 +411,23 @@ def build_actions_rest_api(
                 rejection_action_name: {
                     "type": "OpenApiConnection",
                     "inputs": {
-                        "host": {
-                            "apiId": "/providers/Microsoft.PowerApps/apis/shared_office365",
-                            "connectionName": "shared_office365",
-                            "operationId": "SendEmailV2"
-                        },
+                        "host": dict(_EMAIL_HOST),
                         "parameters": {
-                            "emailMessage/To": "@body('Get_response_details')?['r2']?['response']",
+                            "emailMessage/To": _SUBMITTER_EMAIL,
                             "emailMessage/Subject": "Request Rejected",
                             "emailMessage/Body": f"<p>Your request was rejected by {role}.</p>",
                             "emailMessage/Importance": "High"
                         },
-                        "authentication": "@parameters('$authentication')"
+                        "authentication": _AUTH
                     },
                     "runAfter": {},
                     "metadata": {
-                        "operationMetadataId": str(uuid.uuid4())
+                        "operationMetadataId": next(op_ids)
                     }
                 },
                 "Terminate": {
                     "type": "Terminate",
-                    "inputs": {
-                        "runStatus": "Cancelled"
-                    },
+                    "inputs": {"runStatus": "Cancelled"},
                     "runAfter": {
                         rejection_action_name: ["Succeeded"]
                     }
@@ -378,7 +437,7 @@ def build_actions_rest_api(
                 previous_action: ["Succeeded"]
             },
             "metadata": {
-                "operationMetadataId": str(uuid.uuid4())
+                "operationMetadataId": next(op_ids)
             }
         }
         previous_action = action_name
@@ -386,39 +445,110 @@ def build_actions_rest_api(
     
     # Final approval email
     action_name = "Send_final_approval_email"
-    actions[action_name] = {
+    yield action_name, {
         "type": "OpenApiConnection",
         "inputs": {
-            "host": {
-                "apiId": "/providers/Microsoft.PowerApps/apis/shared_office365",
-                "connectionName": "shared_office365",
-                "operationId": "SendEmailV2"
-            },
+            "host": dict(_EMAIL_HOST),
             "parameters": {
-                "emailMessage/To": "@body('Get_response_details')?['r2']?['response']",
+                "emailMessage/To": _SUBMITTER_EMAIL,
                 "emailMessage/Subject": "Request Approved",
                 "emailMessage/Body": "<p>Congratulations! Your request has been fully approved.</p>",
                 "emailMessage/Importance": "High"
             },
-            "authentication": "@parameters('$authentication')"
+            "authentication": _AUTH
         },
         "runAfter": {
             previous_action: ["Succeeded"]
         },
         "metadata": {
-            "operationMetadataId": str(uuid.uuid4())
+            "operationMetadataId": next(op_ids)
         }
     }
-    
-    return actions
 
 
-def find_question_index(form_schema: Dict[str, Any], field_name: str) -> int:
-    """Find the question index (r1, r2, etc.) for a field"""
-    for idx, question in enumerate(form_schema.get("questions", []), 1):
-        if question.get("field_name") == field_name:
-            return idx
-    return 1
+class _ApprovalStrings(NamedTuple):
+    approval: str
+    update_excel: str
+    condition: str
+    rejection_email: str
+    email_field: str
+    status_column: str
+    name_column: str
+    timestamp_column: str
+    comments_column: str
+    outcome_expr: str
+    responder_expr: str
+    comments_expr: str
+    outcome_ref: str
+
+
+class _Approver(NamedTuple):
+    level: int
+    role: str
+    names: _ApprovalStrings
+
+
+@lru_cache(maxsize=None)
+def _sanitize(role: str) -> str:
+    return role.replace(" ", "_")
+
+
+@lru_cache(maxsize=None)
+def _sanitize_lower(role: str) -> str:
+    return role.lower().replace(" ", "_")
+
+
+@lru_cache(maxsize=64)
+def _approval_chain_strings(roles: Tuple[str, ...]) -> Tuple[_ApprovalStrings, ...]:
+    """Role-derived action names and expressions, built once per approval chain"""
+    chain = []
+    for role in roles:
+        sn = _sanitize(role)
+        chain.append(_ApprovalStrings(
+            approval=f"Approval_{sn}",
+            update_excel=f"Update_Excel_{sn}",
+            condition=f"Condition_Check_Rejection_{sn}",
+            rejection_email=f"Send_Rejection_Email_{sn}",
+            email_field=f"{_sanitize_lower(role)}_email",
+            status_column=f"{sn}_Status",
+            name_column=f"{sn}_Name",
+            timestamp_column=f"{sn}_Timestamp",
+            comments_column=f"{sn}_Comments",
+            outcome_expr=f"@{{body('Approval_{sn}')?['outcome']}}",
+            responder_expr=f"@{{body('Approval_{sn}')?['responder']?['displayName']}}",
+            comments_expr=f"@{{body('Approval_{sn}')?['comments']}}",
+            outcome_ref=f"@body('Approval_{sn}')?['outcome']"
+        ))
+    return tuple(chain)
+
+
+def _opid() -> str:
+    """GUID-formatted operation id straight from os.urandom, no uuid.UUID object"""
+    b = os.urandom(16)
+    return f"{b[:4].hex()}-{b[4:6].hex()}-{b[6:8].hex()}-{b[8:10].hex()}-{b[10:].hex()}"
+
+
+def _operation_ids(count: int) -> Iterator[str]:
+    """Yield GUID-formatted operation ids from a single os.urandom call"""
+    hex_ids = binascii.hexlify(os.urandom(16 * count)).decode()
+    for i in range(0, len(hex_ids), 32):
+        h = hex_ids[i:i + 32]
+        yield f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+# Large approval chains produce multi-MB definitions; past this size copy straight into the page cache
+_MMAP_WRITE_THRESHOLD = 1 << 20
+
+
+def _write_mmap(path: str, data: bytes) -> None:
+    """Write bytes through a shared mapping sized to the payload"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, len(data))
+        with mmap.mmap(fd, len(data)) as mm:
+            mm[:] = data
+    finally:
+        os.close(fd)
 
 
 def save_flow_definition_for_api(master_json: Dict[str, Any], output_file: str = "flow_for_rest_api.json"):
@@ -426,41 +556,63 @@ def save_flow_definition_for_api(master_json: Dict[str, Any], output_file: str =
     Save the flow definition in the correct format for REST API
     """
     
-    print("\n" + "="*80)
-    print("🔄 GENERATING FLOW DEFINITION FOR POWER AUTOMATE REST API")
-    print("="*80)
-    
     flow_def = generate_flow_definition_for_rest_api(master_json)
     
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(flow_def, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        data = orjson.dumps(flow_def, option=orjson.OPT_INDENT_2)
+        if len(data) > _MMAP_WRITE_THRESHOLD:
+            _write_mmap(output_file, data)
+        else:
+            with open(output_file, "wb") as f:
+                f.write(data)
+    else:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(flow_def, f, indent=2, ensure_ascii=False)
     
-    print(f"\n✅ Flow definition saved: {output_file}")
-    print("\n📋 DEPLOYMENT INSTRUCTIONS:")
-    print("-"*80)
-    print("1. This JSON is ready for the Power Automate REST API")
-    print("2. Use the PowerAutomateRestClient class to deploy")
-    print("3. Required placeholders to configure:")
-    print("   • {FORM_ID_PLACEHOLDER}")
-    print("   • {DRIVE_ID_PLACEHOLDER}")
-    print("   • {FILE_ID_PLACEHOLDER}")
-    print("   • {CONNECTION_ID_*}")
-    print("\n" + "="*80)
+    # Emit the whole report in one write instead of one print per line
+    lines = [
+        "",
+        "=" * 80,
+        "[INFO] GENERATING FLOW DEFINITION FOR POWER AUTOMATE REST API",
+        "=" * 80,
+        "",
+        f"[SAVE] Flow definition saved: {output_file}",
+        "",
+        "[DEPLOY] DEPLOYMENT INSTRUCTIONS:",
+        "-" * 80,
+        "1. This JSON is ready for the Power Automate REST API",
+        "2. Use the PowerAutomateRestClient class to deploy",
+        "3. Required placeholders to configure:",
+        "   - {FORM_ID_PLACEHOLDER}",
+        "   - {DRIVE_ID_PLACEHOLDER}",
+        "   - {FILE_ID_PLACEHOLDER}",
+        "   - {CONNECTION_ID_*}",
+        "",
+        "=" * 80,
+    ]
+    sys.stdout.write("\n".join(lines) + "\n")
     
     return output_file
 
 
+def _load_json_file(path: str) -> Any:
+    """Parse a JSON file with orjson when it is installed"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # ============================================================================
 # USAGE
 # ============================================================================
 
 if __name__ == "__main__":
     # Load master JSON from workflow generator
-    with open("master_workflow.json", "r") as f:
-        master_json = json.load(f)
+    master_json = _load_json_file("master_workflow.json")
     
     # Generate proper format for REST API
     output_file = save_flow_definition_for_api(master_json)
     
-    print(f"\n✅ Ready for deployment via REST API!")
-    print(f"📄 File: {output_file}")
\ No newline at end of file
+    sys.stdout.write(f"\n[SUCCESS] Ready for deployment via REST API!\n[FILE] {output_file}\n")
\ No newline at end of file
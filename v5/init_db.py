@@ -5,32 +5,36 @@ import os
 db_path = 'database'
 
 # Connect to the database (this will create it if it doesn't exist)
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
+# Autocommit mode: executescript runs the whole schema in one pass
+conn = sqlite3.connect(db_path, isolation_level=None)
+
+# WAL + synchronous=NORMAL keeps commits cheap; the journal mode persists in the file
+conn.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
 
-# Create the chatlog table
-cursor.execute('''
     CREATE TABLE IF NOT EXISTS chatlog (
-        chatid TEXT,
+        chatid TEXT NOT NULL,
         message TEXT,
         timestamp TEXT,
         sender TEXT,
         workflow_generated BOOLEAN DEFAULT FALSE
-    )
-''')
+    );
 
-# Create the state table
-cursor.execute('''
     CREATE TABLE IF NOT EXISTS state (
-        chatid TEXT,
-        workflow TEXT,
+        chatid TEXT NOT NULL,
+        workflow BLOB,
         version TEXT,
         timestamp TEXT
-    )
+    );
+
+    -- chatid index entries are kept in rowid order, which is how chat messages are sorted
+    CREATE INDEX IF NOT EXISTS idx_chatlog_chatid ON chatlog(chatid);
+    -- Matches the CAST(version AS INTEGER) lookups so latest/max version is an index seek
+    CREATE INDEX IF NOT EXISTS idx_state_chatid_version ON state(chatid, CAST(version AS INTEGER));
 ''')
 
 print("Database 'database' created/connected successfully.")
 print("Tables 'chatlog' and 'state' ensured.")
 
-conn.commit()
 conn.close()
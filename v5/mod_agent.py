@@ -1,49 +1,495 @@
 import os
+import re
+import time
+import hashlib
 import json
 import sqlite3
-from datetime import datetime
-from typing import TypedDict, Dict, List, Any
+import threading
+from typing import TypedDict, Dict, List, Any, Optional
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.graph import StateGraph, END
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from workflow_codec import encode_workflow_json, decompress_workflow_json
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # optional: langgraph-checkpoint-sqlite not installed, keep checkpoints in memory
+    SqliteSaver = None
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional: LLM replies are parsed without shape checks
+    msgspec = None
 
 # Load environment variables
 load_dotenv()
 
+# Appends the next version for a chat in one statement; MAX() is served by
+# idx_state_chatid_version (see init_db.py) and RETURNING hands back the number
+Q_INSERT_NEXT_VERSION = '''
+    INSERT INTO state (chatid, workflow, version, timestamp)
+    SELECT :chatid, :workflow, CAST(COALESCE(MAX(CAST(version AS INTEGER)), 0) + 1 AS TEXT), :timestamp
+    FROM state WHERE chatid = :chatid
+    RETURNING version
+'''
+
+# System prompts. They never contain per-call data, and each human message starts with
+# the per-thread workflow summary, so consecutive calls share a long identical prefix
+# that providers with automatic prefix caching can serve from cache.
+SYS_ANALYZE = """You are a workflow modification expert. Always return valid JSON only.
+
+Analyze what needs to be changed in the workflow described by the user message.
+
+If the request is clear enough to act on without asking the user anything, also create
+a detailed step-by-step modification plan. Otherwise set "plan" to null.
+
+Return ONLY valid JSON:
+{
+  "analysis": {
+    "modification_type": "add_approver|remove_approver|change_sequence|add_field|modify_notification|add_condition|other",
+    "affected_components": ["approval_chain", "form_schema", "excel_schema", "workflow_steps"],
+    "complexity": "simple|moderate|complex",
+    "requires_clarification": true/false,
+    "clarification_topics": ["list topics needing clarification"],
+    "summary": "Brief summary of what will be changed"
+  },
+  "plan": {
+    "changes": [
+      {
+        "component": "approval_chain|form_schema|excel_schema|workflow_steps|notifications",
+        "action": "add|remove|modify|reorder",
+        "details": {
+          "specific_field": "value",
+          "position": "where applicable",
+          "new_value": "if modifying"
+        },
+        "rationale": "why this change"
+      }
+    ],
+    "version_change": "1.0 -> 1.1",
+    "impact_assessment": "Brief description of impact"
+  }
+}
+
+Return ONLY the JSON, no other text."""
+
+SYS_QUESTIONS = """You are a workflow clarification expert. Return valid JSON only.
+
+You are helping modify a workflow. Generate clarifying questions to ensure accurate modifications.
+
+Generate 2-4 clarifying questions to ensure proper modification. Focus on:
+1. Specific details needed for the modification
+2. Placement/ordering if relevant
+3. Dependencies or impacts on other components
+4. Any ambiguities in the request
+
+Return ONLY valid JSON:
+{
+  "questions": [
+    {
+      "id": "q1",
+      "question": "Clear, specific question",
+      "purpose": "Why this question is important",
+      "answer_type": "text|number|choice",
+      "options": ["if choice type"],
+      "validation": "What makes a valid answer"
+    }
+  ]
+}"""
+
+SYS_VALIDATE = """You are a validation expert. Return valid JSON only.
+
+You are validating answers for a workflow modification.
+Determine if we have enough information to proceed with the modification.
+
+Return ONLY valid JSON:
+{
+  "can_proceed": true/false,
+  "validation_summary": "Brief explanation",
+  "missing_information": ["list any critical missing info"],
+  "concerns": ["any potential issues or ambiguities"]
+}"""
+
+SYS_PLAN = """You are a modification planning expert. Return valid JSON only.
+
+You are creating a detailed modification plan for a workflow.
+Create a detailed step-by-step modification plan.
+
+Return ONLY valid JSON:
+{
+  "changes": [
+    {
+      "component": "approval_chain|form_schema|excel_schema|workflow_steps|notifications",
+      "action": "add|remove|modify|reorder",
+      "details": {
+        "specific_field": "value",
+        "position": "where applicable",
+        "new_value": "if modifying"
+      },
+      "rationale": "why this change"
+    }
+  ],
+  "version_change": "1.0 -> 1.1",
+  "impact_assessment": "Brief description of impact"
+}"""
+
+# Exact-match LLM response cache, keyed by a hash of the thread id and the full message list.
+# Entries live for one modification run: they are dropped when the thread finishes and
+# ignored (then pruned) once older than the TTL, so a retried request gets a fresh answer
+Q_CREATE_LLM_CACHE = '''
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        thread_id TEXT,
+        response TEXT NOT NULL,
+        ts INTEGER NOT NULL
+    )
+'''
+Q_GET_CACHED_RESPONSE = "SELECT response FROM llm_cache WHERE key = ? AND ts >= ?"
+Q_PUT_CACHED_RESPONSE = "INSERT OR REPLACE INTO llm_cache (key, thread_id, response, ts) VALUES (?, ?, ?, ?)"
+Q_PRUNE_LLM_CACHE = "DELETE FROM llm_cache WHERE thread_id = ? OR ts < ?"
+
+# Strips "1." / "2)" style numbering from batched answer lines
+_ANSWER_NUMBERING = re.compile(r"^\s*\d+[.)]\s*")
+
+# Dotted numeric version with an optional label ("v1.2"): everything up to the last dot, then the last number
+_VERSION_RE = re.compile(r"^(?P<prefix>\D*(?:\d+\.)+)(?P<last>\d+)")
+
+# Form question ids as generated: "q" followed by a number
+_QUESTION_ID = re.compile(r"^q(\d+)$")
+
+# Top-level workflow sections each plan component's modifier writes to
+_COMPONENT_SECTIONS = {
+    "approval_chain": ("workflow_analysis", "microsoft_forms"),
+    "form_schema": ("microsoft_forms",),
+    "excel_schema": ("excel_tracker",),
+    "workflow_steps": ("power_automate_workflow",),
+    "notifications": ("workflow_analysis",),
+}
+
+# Fixed-form requests that map straight to one plan change, no LLM needed.
+# Each pattern must match the whole request; anything more involved goes to the model.
+# A name is either quoted (spaces allowed) or a single bare word: (?P<x_q>...) | (?P<x>...)
+_FAST_NAME = r"""(?:["'](?P<{0}_q>[^"']+)["']|(?P<{0}>[\w-]+))"""
+_FAST_PATHS = [
+    (re.compile(r"(?:remove|delete|drop)\s+(?:the\s+)?level\s+(?P<level>\d+)\s+(?:approver|approval)", re.I),
+     "remove_approver", "approval_chain", "remove"),
+    (re.compile(r"(?:remove|delete|drop)\s+(?:the\s+)?(?:approver|approval)\s+(?:at\s+)?level\s+(?P<level>\d+)", re.I),
+     "remove_approver", "approval_chain", "remove"),
+    (re.compile(r"(?:add|insert)\s+(?:(?:an?|the)\s+)?(?P<role>[a-z]+(?:\s+[a-z]+){0,3}?)\s+approver(?:\s+(?:at|as)\s+level\s+(?P<level>\d+))?", re.I),
+     "add_approver", "approval_chain", "add"),
+    (re.compile(r"(?:add|insert)\s+(?:an?\s+)?(?:excel\s+|tracker\s+)column\s+(?:called\s+|named\s+)?" + _FAST_NAME.format("name"), re.I),
+     "add_field", "excel_schema", "add"),
+    (re.compile(r"(?:remove|delete|drop)\s+(?:the\s+)?(?:excel\s+|tracker\s+)column\s+" + _FAST_NAME.format("name"), re.I),
+     "other", "excel_schema", "remove"),
+    (re.compile(r"(?:remove|delete|drop)\s+(?:the\s+)?(?:form\s+)?field\s+" + _FAST_NAME.format("field_name"), re.I),
+     "other", "form_schema", "remove"),
+]
+
+# Words that qualify "approver" without naming a role ("add an additional approver",
+# "add a second approver", "add an approver", where the article backtracks into the
+# role group); a role containing any of them goes to the model
+_NOT_A_ROLE = re.compile(
+    r"a|an|the|my|your|our|their|this|that|some|"
+    r"new|another|extra|additional|more|other|next|final|last|one|"
+    r"first|second|third|fourth|fifth|\d+(?:st|nd|rd|th)",
+    re.I
+)
+
+# More than one change in a request ("... and remove level 1"): leave it to the model
+_COMPOUND_REQUEST = re.compile(r"\b(?:and|then|also|plus)\b|[,;]", re.I)
+
+def _match_fast_path(text):
+    """
+    (modification_type, component, action, details) for a request matching one of
+    _FAST_PATHS, None when the request needs the model. Targets are not checked yet
+    """
+    text = text.strip().rstrip(".!")
+    if _COMPOUND_REQUEST.search(text):
+        return None
+    for pattern, modification_type, component, action in _FAST_PATHS:
+        m = pattern.fullmatch(text)
+        if not m:
+            continue
+        details = {}
+        for key, value in m.groupdict().items():
+            if value:
+                details[key.removesuffix("_q")] = int(value) if key == "level" else value.strip()
+        if "role" in details:
+            words = details["role"].split()
+            if any(_NOT_A_ROLE.fullmatch(word) for word in words):
+                return None
+            # Title case like the roles the model writes ("Finance Manager"); acronyms stay as typed
+            details["role"] = " ".join(w if w.isupper() else w.capitalize() for w in words)
+        return modification_type, component, action, details
+    return None
+
+def _resolve_fast_path(workflow, component, action, details):
+    """
+    Check a fast-path change against the workflow it will be applied to. Returns the details
+    with names replaced by the workflow's own spelling, or None when the target doesn't
+    resolve (no such level/field/column, or the column already exists)
+    """
+    if component == "approval_chain":
+        chain = workflow.get("workflow_analysis", {}).get("approval_chain", [])
+        level = details.get("level")
+        if action == "remove":
+            return details if any(a.get("level") == level for a in chain) else None
+        if level is not None and not 1 <= level <= len(chain) + 1:
+            return None
+        role = details["role"].lower()
+        if any(str(a.get("approver_role", "")).lower() == role for a in chain):
+            return None
+        return details
+    if component == "excel_schema":
+        names = {str(c.get("name", "")).lower(): c.get("name") for c in workflow.get("excel_tracker", {}).get("columns", [])}
+        existing = names.get(details["name"].lower())
+        if action == "add":
+            return details if existing is None else None
+        return dict(details, name=existing) if existing is not None else None
+    if component == "form_schema":
+        wanted = details["field_name"].lower()
+        snake = re.sub(r"[\s-]+", "_", wanted)
+        for q in workflow.get("microsoft_forms", {}).get("questions", []):
+            field_name = str(q.get("field_name", ""))
+            if field_name.lower() in (wanted, snake) or str(q.get("title", "")).lower() == wanted:
+                return dict(details, field_name=field_name)
+        return None
+    return None
+
+def _renumber(items, key):
+    """Set items[i][key] = i + 1, skipping entries that already hold the right number"""
+    for number, item in zip(range(1, len(items) + 1), items):
+        if item.get(key) != number:
+            item[key] = number
+
+def _drop_and_renumber(items, key, value):
+    """items without the entries whose key equals value, renumbered from 1 in the same pass"""
+    kept = []
+    for item in items:
+        if item.get(key) != value:
+            kept.append(item)
+            if item.get(key) != len(kept):
+                item[key] = len(kept)
+    return kept
+
+def _names_to_drop(details, key):
+    """Names a remove change targets: details[key] and/or a details[key + "s"] list, as a set"""
+    names = set(details.get(key + "s") or ())
+    if details.get(key) is not None:
+        names.add(details[key])
+    return names
+
+def _next_question_number(questions):
+    """First free N for a "qN" id: one past the highest in use, so ids stay unique after removals"""
+    highest = 0
+    for q in questions:
+        m = _QUESTION_ID.match(str(q.get("id", "")))
+        if m:
+            highest = max(highest, int(m.group(1)))
+    return highest + 1
+
+def _strip_fence(text):
+    """Drop a surrounding ``` / ```json markdown fence from an LLM reply"""
+    text = text.strip()
+    if text.startswith("```"):
+        newline = text.find("\n")
+        text = text[newline + 1:] if newline != -1 else text[3:]
+        if text.endswith("```"):
+            text = text[:-3]
+        text = text.strip()
+    return text
+
+def _is_json(text):
+    try:
+        _json_loads(text)
+        return True
+    except ValueError:
+        return False
+
+def _prompt_json(value):
+    """Single-line JSON for prompt embedding: no indent whitespace, no \\u escapes"""
+    return json.dumps(value, ensure_ascii=False)
+
+def _json_loads(text):
+    """Parse JSON text with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _decode_reply(text, reply_type):
+    """
+    Parse an LLM JSON reply; with msgspec the shape is checked against reply_type
+    in the same pass and a mismatch raises like malformed JSON does
+    """
+    if msgspec is not None:
+        return msgspec.json.decode(text, type=reply_type)
+    return _json_loads(text)
+
+def _deep_copy_workflow(workflow):
+    """Copy a JSON-shaped workflow (or section of one) through a serialize/parse round-trip"""
+    if orjson is not None:
+        return orjson.loads(orjson.dumps(workflow))
+    return json.loads(json.dumps(workflow))
+
+WORKFLOWS_DIR = os.path.join(os.path.dirname(__file__), 'workflows')
+
+def _write_workflow_snapshot(thread_id, workflow):
+    """
+    Write the workflow being modified to workflows/<thread_id>.input.json and return the path.
+    The graph state keeps only this path, so checkpoints don't carry the whole workflow.
+    """
+    os.makedirs(WORKFLOWS_DIR, exist_ok=True)
+    path = os.path.join(WORKFLOWS_DIR, f"{thread_id}.input.json")
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(workflow) if orjson is not None else json.dumps(workflow).encode("utf-8"))
+    return path
+
+def _load_workflow_ref(ref):
+    if not ref or not os.path.exists(ref):
+        return {}
+    with open(ref, 'rb') as f:
+        return _json_loads(f.read())
+
+# Shapes of the LLM JSON replies. They stay plain dicts (checkpointed, embedded in
+# prompts), msgspec just validates them while decoding
+class Analysis(TypedDict, total=False):
+    modification_type: str
+    affected_components: List[str]
+    complexity: str
+    requires_clarification: bool
+    clarification_topics: List[str]
+    summary: str
+
+class PlanChange(TypedDict, total=False):
+    component: str
+    action: str
+    details: Dict[str, Any]
+    rationale: str
+
+class ModificationPlan(TypedDict, total=False):
+    changes: List[PlanChange]
+    version_change: str
+    impact_assessment: str
+
+class AnalysisReply(TypedDict, total=False):
+    analysis: Analysis
+    plan: Optional[ModificationPlan]
+
+class ClarifyingQuestion(TypedDict, total=False):
+    id: str
+    question: str
+    purpose: str
+    answer_type: str
+    options: Optional[List[str]]
+    validation: Optional[str]
+
+class QuestionsReply(TypedDict, total=False):
+    questions: List[ClarifyingQuestion]
+
+class AnswerValidation(TypedDict, total=False):
+    can_proceed: bool
+    validation_summary: str
+    missing_information: List[str]
+    concerns: List[str]
+
 class ModificationState(TypedDict):
-    original_workflow: Dict[str, Any]
+    workflow_ref: str  # Path of the input snapshot; loaded only where the full workflow is needed
     workflow_summary: str  # Token-efficient summary of workflow
     modification_request: str
-    analysis: Dict[str, Any]
-    clarifying_questions: List[Dict[str, Any]]
+    analysis: Analysis
+    clarifying_questions: List[ClarifyingQuestion]
     user_answers: Dict[str, Any]
     validation_result: Dict[str, Any]
     question_iteration: int
-    modification_plan: Dict[str, Any]
+    modification_plan: ModificationPlan
     modified_workflow: Dict[str, Any]
     changes_applied: List[str]
     last_message: str
     last_user_message: str
     chat_id: str
-    current_question_index: int
     logs: List[str]
     question_history: List[Dict]  # Track all questions asked
+    fast_path: bool  # False forces the LLM analysis even for fixed-form requests
+
+class CompressedSerializer:
+    """
+    Checkpoint serializer that compresses the default serializer's payloads with the
+    workflow codec (zstd or gzip). Checkpoints hold the JSON-heavy plan, analysis and
+    question batches, which compress well. Payloads written without compression are
+    still read as-is.
+    """
+    SUFFIX = "+z"
+
+    def __init__(self, inner=None):
+        self.inner = inner or JsonPlusSerializer()
+
+    def dumps_typed(self, obj):
+        type_, data = self.inner.dumps_typed(obj)
+        if not data:
+            return type_, data
+        return type_ + self.SUFFIX, encode_workflow_json(data)
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            return self.inner.loads_typed((type_[:-len(self.SUFFIX)], decompress_workflow_json(payload)))
+        return self.inner.loads_typed(data)
 
 class WorkflowModificationAgent:
+    # Seconds a cached LLM response stays usable
+    llm_cache_ttl = 3600
+
     def __init__(self):
         self.llm_key = os.getenv('llm_key')
         self.model = ChatOpenAI(
             model="openai/gpt-oss-20b:free",
             api_key=self.llm_key,
             base_url="https://openrouter.ai/api/v1",
-            temperature=0.7
+            # Every call here expects a JSON object back: keep sampling tight and use JSON mode
+            temperature=0.1,
+            model_kwargs={"response_format": {"type": "json_object"}}
         )
-        self.checkpointer = MemorySaver()
+        # Fixed per node, so built once instead of on every LLM call
+        self._analysis_system = SystemMessage(content=SYS_ANALYZE)
+        self._questions_system = SystemMessage(content=SYS_QUESTIONS)
+        self._validation_system = SystemMessage(content=SYS_VALIDATE)
+        self._planning_system = SystemMessage(content=SYS_PLAN)
+        # Plan component -> modifier; keys match _COMPONENT_SECTIONS
+        self._handlers = {
+            "approval_chain": self._modify_approval_chain,
+            "form_schema": self._modify_form_schema,
+            "excel_schema": self._modify_excel_schema,
+            "workflow_steps": self._modify_workflow_steps,
+            "notifications": self._modify_notifications,
+        }
+        # One connection to the app database for both checkpoints and state rows
+        db_path = os.path.join(os.path.dirname(__file__), 'database')
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+        """)
+        if SqliteSaver is not None:
+            self.checkpointer = SqliteSaver(self._db, serde=CompressedSerializer())
+            # The saver serializes its own use of the connection with this lock; share it
+            self._db_lock = self.checkpointer.lock
+        else:
+            self.checkpointer = MemorySaver(serde=CompressedSerializer())
+            self._db_lock = threading.Lock()
+        self._db.execute(Q_CREATE_LLM_CACHE)
+        self._db.commit()
         self.app = self._build_graph()
 
-    def run_step_stream(self, user_input: str, thread_id: str, original_workflow: Dict[str, Any] = None):
+    def run_step_stream(self, user_input: str, thread_id: str, original_workflow: Dict[str, Any] = None, fast_path: bool = True):
         """
         Streaming execution with interrupts for question collection
         """
@@ -57,43 +503,52 @@ class WorkflowModificationAgent:
             workflow_summary = self._create_workflow_summary(original_workflow) if original_workflow else ""
             
             initial_state = {
-                "original_workflow": original_workflow or {},
+                "workflow_ref": _write_workflow_snapshot(thread_id, original_workflow or {}),
                 "workflow_summary": workflow_summary,
                 "modification_request": user_input,
                 "question_iteration": 0,
                 "user_answers": {},
                 "chat_id": thread_id,
-                "current_question_index": 0,
                 "last_user_message": "",
                 "logs": [],
                 "changes_applied": [],
                 "question_history": [],
-                "validation_result": {}
+                "validation_result": {},
+                "fast_path": fast_path
             }
             # Run until interrupt (collect_answers) or End
-            for event in self.app.stream(initial_state, config=config):
-                for node_name, output in event.items():
-                    if "last_message" in output:
-                        yield f"Status: {output['last_message']}"
-                    else:
-                        yield f"Status: {node_name.replace('_', ' ').title()}..."
+            yield from self._stream_updates(initial_state, config)
 
         else:
             # Resume with user input
             self.app.update_state(config, {"last_user_message": user_input})
             # Resume execution
-            for event in self.app.stream(None, config=config):
-                for node_name, output in event.items():
-                    if "last_message" in output:
-                        yield f"Status: {output['last_message']}"
-                    else:
-                        yield f"Status: {node_name.replace('_', ' ').title()}..."
+            yield from self._stream_updates(None, config)
                 
         # Get final state to retrieve response
         final_state = self.app.get_state(config)
+        self._evict_if_finished(thread_id, final_state)
         yield {"final_message": final_state.values.get("last_message", "Processing completed.")}
 
-    def run_step(self, user_input: str, thread_id: str, original_workflow: Dict[str, Any] = None):
+    def _stream_updates(self, graph_input, config):
+        """
+        Yield node status strings plus {"token": ..., "node": ...} deltas from the LLM calls,
+        so the caller sees output while a model response is still being generated.
+        Nodes in the parallel fan-out stream at the same time, so each delta names its node
+        """
+        for mode, chunk in self.app.stream(graph_input, config=config, stream_mode=["updates", "messages"]):
+            if mode == "messages":
+                message, metadata = chunk
+                if message.content:
+                    yield {"token": message.content, "node": metadata.get("langgraph_node")}
+                continue
+            for node_name, output in chunk.items():
+                if output and "last_message" in output:
+                    yield f"Status: {output['last_message']}"
+                else:
+                    yield f"Status: {node_name.replace('_', ' ').title()}..."
+
+    def run_step(self, user_input: str, thread_id: str, original_workflow: Dict[str, Any] = None, fast_path: bool = True):
         """
         Non-streaming fallback
         """
@@ -103,17 +558,17 @@ class WorkflowModificationAgent:
         if not state.values:
             workflow_summary = self._create_workflow_summary(original_workflow) if original_workflow else ""
             initial_state = {
-                "original_workflow": original_workflow or {},
+                "workflow_ref": _write_workflow_snapshot(thread_id, original_workflow or {}),
                 "workflow_summary": workflow_summary,
                 "modification_request": user_input,
                 "question_iteration": 0,
                 "user_answers": {},
                 "chat_id": thread_id,
-                "current_question_index": 0,
                 "last_user_message": "",
                 "logs": [],
                 "changes_applied": [],
-                "question_history": []
+                "question_history": [],
+                "fast_path": fast_path
             }
             self.app.invoke(initial_state, config=config)
         else:
@@ -121,8 +576,64 @@ class WorkflowModificationAgent:
             self.app.invoke(None, config=config)
         
         final_state = self.app.get_state(config)
+        self._evict_if_finished(thread_id, final_state)
         return final_state.values.get("last_message", "Processing completed.")
 
+    def _evict_if_finished(self, thread_id, final_state):
+        """
+        Drop a thread's checkpoints once its graph run reaches END. Nothing resumes a finished
+        run, and removing it lets the chat's next request start a fresh modification
+        """
+        if final_state.next:
+            return  # paused at collect_answers, waiting for the user's reply
+        self.forget_thread(thread_id)
+
+    def forget_thread(self, thread_id):
+        """
+        Remove everything kept for a thread: its checkpoints, its input snapshot and its
+        cached LLM responses. Also used when a chat is deleted, including threads that were
+        abandoned while waiting for answers
+        """
+        delete_thread = getattr(self.checkpointer, "delete_thread", None)
+        if delete_thread is not None:
+            delete_thread(thread_id)  # the saver takes its own lock
+        snapshot = os.path.join(WORKFLOWS_DIR, f"{thread_id}.input.json")
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+        self._prune_llm_cache(thread_id)
+
+    def _prune_llm_cache(self, thread_id):
+        """Drop the thread's cached responses and any that are past the TTL"""
+        with self._db_lock, self._db:
+            self._db.execute(Q_PRUNE_LLM_CACHE, (thread_id, int(time.time()) - self.llm_cache_ttl))
+
+    def _invoke(self, messages, cache_thread=None):
+        """
+        Call the model and report how much of the prompt the provider served from its prefix cache
+        With cache_thread set, an identical earlier prompt in that thread is answered from the
+        llm_cache table
+        """
+        if cache_thread:
+            key = hashlib.sha256("\x00".join([cache_thread, *(m.content for m in messages)]).encode("utf-8")).hexdigest()
+            with self._db_lock:
+                row = self._db.execute(Q_GET_CACHED_RESPONSE, (key, int(time.time()) - self.llm_cache_ttl)).fetchone()
+            if row:
+                print("[LLM] Response served from local cache")
+                return AIMessage(content=row[0])
+        
+        response = self.model.invoke(messages)
+        
+        if cache_thread and _is_json(_strip_fence(response.content)):
+            # Malformed replies are not cached, so a retry gets a fresh answer
+            with self._db_lock, self._db:
+                self._db.execute(Q_PUT_CACHED_RESPONSE, (key, cache_thread, response.content, int(time.time())))
+        
+        usage = getattr(response, "usage_metadata", None) or {}
+        cache_read = usage.get("input_token_details", {}).get("cache_read")
+        if cache_read:
+            print(f"[LLM] {cache_read}/{usage.get('input_tokens')} prompt tokens read from cache")
+        return response
+
     def _create_workflow_summary(self, workflow: Dict[str, Any]) -> str:
         """
         Create a token-efficient summary of the workflow for context
@@ -158,59 +669,64 @@ class WorkflowModificationAgent:
         
         return "\n".join(summary_parts)
 
-    def _analyze_modification_request(self, state: ModificationState):
+    def _analyze_and_plan(self, state: ModificationState):
         """
         Analyze what needs to be modified using workflow summary for efficiency
+        When no clarification is needed the same call also returns the modification plan,
+        so the common path skips the separate create_plan round-trip
         """
         workflow_summary = state.get("workflow_summary", "")
         modification_request = state.get("modification_request", "")
         
+        fast = self._fast_classify(state)
+        if fast:
+            print(f"\n[ANALYSIS] Fixed-form request ({fast['analysis']['modification_type']}), skipping LLM")
+            return {
+                "analysis": fast["analysis"],
+                "modification_plan": fast["plan"],
+                "question_iteration": 0,
+                "last_message": f"Analysis complete: {fast['analysis']['summary']}"
+            }
+        
         print("\n[LLM] Analyzing modification request...")
         
         # Use summary instead of full workflow to save tokens
-        prompt = f"""
-You are a workflow modification expert. Analyze what needs to be changed.
-
-CURRENT WORKFLOW SUMMARY:
+        prompt = f"""CURRENT WORKFLOW SUMMARY:
 {workflow_summary}
 
 USER'S MODIFICATION REQUEST:
 "{modification_request}"
-
-Analyze and return ONLY valid JSON:
-{{
-  "modification_type": "add_approver|remove_approver|change_sequence|add_field|modify_notification|add_condition|other",
-  "affected_components": ["approval_chain", "form_schema", "excel_schema", "workflow_steps"],
-  "complexity": "simple|moderate|complex",
-  "requires_clarification": true/false,
-  "clarification_topics": ["list topics needing clarification"],
-  "summary": "Brief summary of what will be changed"
-}}
-
-Return ONLY the JSON, no other text.
 """
         try:
             messages = [
-                SystemMessage(content="You are a workflow analysis expert. Always return valid JSON only."),
+                self._analysis_system,
                 HumanMessage(content=prompt)
             ]
-            response = self.model.invoke(messages)
-            response_text = response.content.strip()
-            
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
+            response = self._invoke(messages, cache_thread=state.get("chat_id"))
+            response_text = _strip_fence(response.content)
             
-            analysis = json.loads(response_text)
+            result = _decode_reply(response_text, AnalysisReply)
+            if "analysis" in result:
+                analysis = result["analysis"]
+                plan = result.get("plan")
+            else:
+                # Model answered with the bare analysis object
+                analysis = _decode_reply(response_text, Analysis)
+                plan = None
             
             print(f"[ANALYSIS] Type: {analysis.get('modification_type')}")
             print(f"[ANALYSIS] Complexity: {analysis.get('complexity')}")
             print(f"[ANALYSIS] Requires clarification: {analysis.get('requires_clarification')}")
             
-            return {
+            update = {
                 "analysis": analysis,
                 "question_iteration": 0,
                 "last_message": f"Analysis complete: {analysis.get('summary')}"
             }
+            if isinstance(plan, dict) and not analysis.get("requires_clarification", True):
+                print(f"[PLAN] {len(plan.get('changes', []))} changes planned")
+                update["modification_plan"] = plan
+            return update
         except Exception as e:
             print(f"[ERROR] Analysis failed: {e}")
             return {
@@ -222,32 +738,99 @@ Return ONLY the JSON, no other text.
                 "last_message": "Analysis completed with defaults."
             }
 
+    def _fast_classify(self, state: ModificationState):
+        """
+        Analysis and plan for a fixed-form request whose target exists in the workflow, in the
+        shape of an AnalysisReply; None when the request needs the model or the run opted out
+        """
+        if not state.get("fast_path", True):
+            return None
+        match = _match_fast_path(state.get("modification_request", ""))
+        if match is None:
+            return None
+        modification_type, component, action, details = match
+        details = _resolve_fast_path(_load_workflow_ref(state.get("workflow_ref")), component, action, details)
+        if details is None:
+            return None
+        section = component.replace('_', ' ')
+        return {
+            "analysis": {
+                "modification_type": modification_type,
+                "affected_components": [component],
+                "complexity": "simple",
+                "requires_clarification": False,
+                "clarification_topics": [],
+                "summary": f"{action} in {section}"
+            },
+            "plan": {
+                "changes": [{
+                    "component": component,
+                    "action": action,
+                    "details": details,
+                    "rationale": "Requested directly"
+                }],
+                "impact_assessment": f"Single {action} in {section}"
+            }
+        }
+
     def _generate_clarifying_questions(self, state: ModificationState):
         """
         Generate questions based on analysis and workflow context
         Similar to agent.py but uses workflow summary for efficiency
+        The whole batch is asked in one message and answered in one reply
         """
-        index = state.get("current_question_index", 0)
-        questions = state.get("clarifying_questions", [])
         iteration = state.get("question_iteration", 0)
         
-        # If we have questions and haven't finished them, just move to next
-        if index < len(questions):
-            current_q = questions[index]
-            print(f"\n[QUESTION {index + 1}/{len(questions)}] {current_q['question']}")
-            
+        print(f"\n[LLM] Generating clarifying questions (iteration {iteration})...")
+        
+        try:
+            new_questions = self._request_clarifying_questions(state, state.get("analysis", {}))
+            return self._present_questions(state, new_questions)
+        except Exception as e:
+            print(f"[ERROR] Failed to generate questions: {e}")
             return {
-                "last_message": f"Question {index + 1}/{len(questions)}: {current_q['question']}"
+                "clarifying_questions": [],
+                "last_message": "Proceeding without additional questions."
             }
+
+    def _generate_speculative_questions(self, state: ModificationState):
+        """
+        First question batch, generated from the request alone while analyze_and_plan runs
+        Only writes clarifying_questions so it can share a superstep with analyze_and_plan
+        """
+        if self._fast_classify(state):
+            return {"clarifying_questions": []}
         
-        # Need to generate new batch of questions
+        print("\n[LLM] Generating clarifying questions alongside analysis...")
+        
+        try:
+            return {"clarifying_questions": self._request_clarifying_questions(state, {})}
+        except Exception as e:
+            print(f"[ERROR] Failed to generate questions: {e}")
+            return {"clarifying_questions": []}
+
+    def _join_analysis(self, state: ModificationState):
+        """
+        Keep or discard the speculative questions once the analysis is in
+        """
         analysis = state.get("analysis", {})
+        questions = state.get("clarifying_questions", [])
+        
+        if not analysis.get("requires_clarification", True):
+            print("[INFO] No clarification needed, discarding speculative questions")
+            return {"clarifying_questions": []}
+        if questions:
+            return self._present_questions(state, questions)
+        return {}
+
+    def _request_clarifying_questions(self, state: ModificationState, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Ask the model for a batch of clarifying questions; analysis may be empty
+        """
         workflow_summary = state.get("workflow_summary", "")
         modification_request = state.get("modification_request", "")
         user_answers = state.get("user_answers", {})
         
-        print(f"\n[LLM] Generating clarifying questions (iteration {iteration})...")
-        
         # Build context about what we already know
         answered_summary = ""
         if user_answers:
@@ -255,129 +838,90 @@ Return ONLY the JSON, no other text.
             for qid, answer in user_answers.items():
                 answered_summary += f"- {qid}: {answer}\n"
         
-        prompt = f"""
-You are helping modify a workflow. Generate clarifying questions to ensure accurate modifications.
-
-WORKFLOW SUMMARY:
+        analysis_section = ""
+        if analysis:
+            analysis_section = f"""
+ANALYSIS:
+- Type: {analysis.get('modification_type')}
+- Affected: {', '.join(analysis.get('affected_components', []))}
+- Topics needing clarification: {', '.join(analysis.get('clarification_topics', []))}"""
+        
+        prompt = f"""WORKFLOW SUMMARY:
 {workflow_summary}
 
 MODIFICATION REQUEST:
 "{modification_request}"
-
-ANALYSIS:
-- Type: {analysis.get('modification_type')}
-- Affected: {', '.join(analysis.get('affected_components', []))}
-- Topics needing clarification: {', '.join(analysis.get('clarification_topics', []))}
+{analysis_section}
 {answered_summary}
-
-Generate 2-4 clarifying questions to ensure proper modification. Focus on:
-1. Specific details needed for the modification
-2. Placement/ordering if relevant
-3. Dependencies or impacts on other components
-4. Any ambiguities in the request
-
-Return ONLY valid JSON array:
-[
-  {{
-    "id": "q1",
-    "question": "Clear, specific question",
-    "purpose": "Why this question is important",
-    "answer_type": "text|number|choice",
-    "options": ["if choice type"],
-    "validation": "What makes a valid answer"
-  }}
-]
 """
-        try:
-            messages = [
-                SystemMessage(content="You are a workflow clarification expert. Return valid JSON array only."),
-                HumanMessage(content=prompt)
-            ]
-            response = self.model.invoke(messages)
-            response_text = response.content.strip()
-            
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            new_questions = json.loads(response_text)
-            
-            if not isinstance(new_questions, list):
-                new_questions = []
-            
-            print(f"[INFO] Generated {len(new_questions)} questions")
-            
-            # Add to question history
-            question_history = state.get("question_history", [])
-            question_history.extend(new_questions)
-            
-            if new_questions:
-                first_q = new_questions[0]
-                return {
-                    "clarifying_questions": new_questions,
-                    "current_question_index": 0,
-                    "question_history": question_history,
-                    "last_message": f"Question 1/{len(new_questions)}: {first_q['question']}"
-                }
-            else:
-                return {
-                    "clarifying_questions": [],
-                    "current_question_index": 0,
-                    "question_history": question_history,
-                    "last_message": "No clarifying questions needed."
-                }
-                
-        except Exception as e:
-            print(f"[ERROR] Failed to generate questions: {e}")
+        messages = [
+            self._questions_system,
+            HumanMessage(content=prompt)
+        ]
+        response = self._invoke(messages, cache_thread=state.get("chat_id"))
+        response_text = _strip_fence(response.content)
+        
+        new_questions = _decode_reply(response_text, QuestionsReply).get("questions", [])
+        
+        if not isinstance(new_questions, list):
+            new_questions = []
+        
+        print(f"[INFO] Generated {len(new_questions)} questions")
+        return new_questions
+
+    def _present_questions(self, state: ModificationState, new_questions: List[Dict[str, Any]]):
+        """
+        Record a batch in the question history and show it as one numbered message
+        """
+        # Add to question history
+        question_history = state.get("question_history", []) + new_questions
+        
+        if new_questions:
+            numbered = "\n".join(f"{i + 1}. {q['question']}" for i, q in enumerate(new_questions))
+            print(f"\n[QUESTIONS]\n{numbered}")
+            return {
+                "clarifying_questions": new_questions,
+                "question_history": question_history,
+                "last_message": f"Please answer the following (one answer per line):\n{numbered}"
+            }
+        else:
             return {
                 "clarifying_questions": [],
-                "current_question_index": 0,
-                "last_message": "Proceeding without additional questions."
+                "question_history": question_history,
+                "last_message": "No clarifying questions needed."
             }
 
     def _collect_user_answers(self, state: ModificationState):
         """
-        Collect answer for current question - INTERRUPT POINT
-        Similar to agent.py's collect_answers
+        Collect answers for the whole batch from one reply - INTERRUPT POINT
+        Line i of the reply answers question i; leading "1." / "1)" numbering is ignored
         """
         questions = state.get("clarifying_questions", [])
-        index = state.get("current_question_index", 0)
         user_message = state.get("last_user_message", "").strip()
         
-        if index >= len(questions):
+        if not questions:
             return {"last_message": "All questions answered."}
         
-        current_q = questions[index]
-        
-        # If no user message yet, we're waiting for answer
+        # If no user message yet, we're waiting for answers
         if not user_message:
             return {
-                "last_message": f"Waiting for answer to: {current_q['question']}"
+                "last_message": "Waiting for answers to the questions above."
             }
         
-        # Store the answer
-        user_answers = state.get("user_answers", {})
-        user_answers[current_q["id"]] = user_message
-        
-        print(f"[ANSWER] {current_q['id']}: {user_message}")
+        lines = [_ANSWER_NUMBERING.sub("", line).strip() for line in user_message.split("\n")]
+        lines = [line for line in lines if line]
         
-        # Move to next question
-        next_index = index + 1
+        # Store the answers
+        user_answers = state.get("user_answers", {})
+        for q, answer in zip(questions, lines):
+            user_answers[q["id"]] = answer
+            print(f"[ANSWER] {q['id']}: {answer}")
         
-        if next_index < len(questions):
-            next_q = questions[next_index]
-            return {
-                "user_answers": user_answers,
-                "current_question_index": next_index,
-                "last_user_message": "",  # Clear for next question
-                "last_message": f"Question {next_index + 1}/{len(questions)}: {next_q['question']}"
-            }
-        else:
-            return {
-                "user_answers": user_answers,
-                "current_question_index": next_index,
-                "last_user_message": "",
-                "last_message": "All questions in this batch answered."
-            }
+        return {
+            "user_answers": user_answers,
+            "last_user_message": "",
+            "last_message": "All questions in this batch answered."
+        }
 
     def _validate_user_answers(self, state: ModificationState):
         """
@@ -391,10 +935,7 @@ Return ONLY valid JSON array:
         
         print("\n[LLM] Validating answers...")
         
-        prompt = f"""
-You are validating answers for a workflow modification.
-
-WORKFLOW SUMMARY:
+        prompt = f"""WORKFLOW SUMMARY:
 {workflow_summary}
 
 MODIFICATION REQUEST:
@@ -403,30 +944,17 @@ MODIFICATION REQUEST:
 MODIFICATION TYPE: {analysis.get('modification_type')}
 
 USER ANSWERS:
-{json.dumps(user_answers, indent=2)}
-
-Determine if we have enough information to proceed with the modification.
-
-Return ONLY valid JSON:
-{{
-  "can_proceed": true/false,
-  "validation_summary": "Brief explanation",
-  "missing_information": ["list any critical missing info"],
-  "concerns": ["any potential issues or ambiguities"]
-}}
+{_prompt_json(user_answers)}
 """
         try:
             messages = [
-                SystemMessage(content="You are a validation expert. Return valid JSON only."),
+                self._validation_system,
                 HumanMessage(content=prompt)
             ]
-            response = self.model.invoke(messages)
-            response_text = response.content.strip()
+            response = self._invoke(messages)
+            response_text = _strip_fence(response.content)
             
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            validation = json.loads(response_text)
+            validation = _decode_reply(response_text, AnswerValidation)
             
             print(f"[VALIDATION] Can proceed: {validation.get('can_proceed')}")
             if validation.get('missing_information'):
@@ -455,53 +983,27 @@ Return ONLY valid JSON:
         
         print("\n[LLM] Creating modification plan...")
         
-        prompt = f"""
-You are creating a detailed modification plan for a workflow.
-
-WORKFLOW SUMMARY:
+        prompt = f"""WORKFLOW SUMMARY:
 {workflow_summary}
 
 MODIFICATION REQUEST:
 "{modification_request}"
 
 USER ANSWERS:
-{json.dumps(user_answers, indent=2)}
+{_prompt_json(user_answers)}
 
 ANALYSIS:
-{json.dumps(analysis, indent=2)}
-
-Create a detailed step-by-step modification plan.
-
-Return ONLY valid JSON:
-{{
-  "changes": [
-    {{
-      "component": "approval_chain|form_schema|excel_schema|workflow_steps|notifications",
-      "action": "add|remove|modify|reorder",
-      "details": {{
-        "specific_field": "value",
-        "position": "where applicable",
-        "new_value": "if modifying"
-      }},
-      "rationale": "why this change"
-    }}
-  ],
-  "version_change": "1.0 -> 1.1",
-  "impact_assessment": "Brief description of impact"
-}}
+{_prompt_json(analysis)}
 """
         try:
             messages = [
-                SystemMessage(content="You are a modification planning expert. Return valid JSON only."),
+                self._planning_system,
                 HumanMessage(content=prompt)
             ]
-            response = self.model.invoke(messages)
-            response_text = response.content.strip()
-            
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
+            response = self._invoke(messages)
+            response_text = _strip_fence(response.content)
             
-            plan = json.loads(response_text)
+            plan = _decode_reply(response_text, ModificationPlan)
             
             print(f"[PLAN] {len(plan.get('changes', []))} changes planned")
             
@@ -522,57 +1024,52 @@ Return ONLY valid JSON:
         Apply the modifications to the actual workflow
         Uses full workflow (not summary) to make actual changes
         """
-        original_workflow = state.get("original_workflow", {})
+        original_workflow = _load_workflow_ref(state.get("workflow_ref"))
         plan = state.get("modification_plan", {})
         changes = plan.get("changes", [])
         
         print("\n[INFO] Applying modifications...")
         
-        # Deep copy the workflow
-        modified_workflow = json.loads(json.dumps(original_workflow))
+        # Copy-on-write: share untouched sections with the original, deep copy only
+        # the ones the planned changes (and the version bump) will mutate
+        modified_workflow = dict(original_workflow)
+        touched = {"metadata"}
+        for change in changes:
+            touched.update(_COMPONENT_SECTIONS.get(change.get("component"), ()))
+        for key in touched:
+            if key in modified_workflow:
+                modified_workflow[key] = _deep_copy_workflow(modified_workflow[key])
         changes_applied = []
+        applied = 0
         
         for change in changes:
             component = change.get("component")
             action = change.get("action")
             details = change.get("details", {})
             
+            handler = self._handlers.get(component)
+            if handler is None:
+                continue
+            
             try:
-                if component == "approval_chain":
-                    modified_workflow = self._modify_approval_chain(modified_workflow, action, details)
-                    changes_applied.append(f"{action} in approval chain")
-                    
-                elif component == "form_schema":
-                    modified_workflow = self._modify_form_schema(modified_workflow, action, details)
-                    changes_applied.append(f"{action} in form schema")
-                    
-                elif component == "excel_schema":
-                    modified_workflow = self._modify_excel_schema(modified_workflow, action, details)
-                    changes_applied.append(f"{action} in excel schema")
-                    
-                elif component == "workflow_steps":
-                    modified_workflow = self._modify_workflow_steps(modified_workflow, action, details)
-                    changes_applied.append(f"{action} in workflow steps")
-                    
-                elif component == "notifications":
-                    modified_workflow = self._modify_notifications(modified_workflow, action, details)
-                    changes_applied.append(f"{action} in notifications")
-                    
+                modified_workflow = handler(modified_workflow, action, details)
+                changes_applied.append(f"{action} in {component.replace('_', ' ')}")
+                applied += 1
             except Exception as e:
                 print(f"[ERROR] Failed to apply {component} {action}: {e}")
-                changes_applied.append(f"FAILED: {component} {action}")
+                changes_applied.append(f"FAILED: {component} {action} ({e})")
         
-        # Update version
-        if "metadata" in modified_workflow:
+        # Update version, only when something actually changed
+        if applied and "metadata" in modified_workflow:
             current_version = modified_workflow["metadata"].get("version", "1.0")
             modified_workflow["metadata"]["version"] = self._increment_version(current_version)
         
-        print(f"[INFO] Applied {len(changes_applied)} changes")
+        print(f"[INFO] Applied {applied} of {len(changes)} changes")
         
         return {
             "modified_workflow": modified_workflow,
             "changes_applied": changes_applied,
-            "last_message": f"Applied {len(changes_applied)} modifications"
+            "last_message": f"Applied {applied} modifications"
         }
 
     def _validate_modifications(self, state: ModificationState):
@@ -587,16 +1084,25 @@ Return ONLY valid JSON:
         
         # Check approval chain consistency
         approval_chain = modified_workflow.get("workflow_analysis", {}).get("approval_chain", [])
-        levels = [a["level"] for a in approval_chain]
-        if levels and levels != list(range(1, len(levels) + 1)):
+        if not all(a["level"] == i for i, a in enumerate(approval_chain, 1)):
             issues.append("Approval levels are not sequential")
         
         # Check form-approver consistency
         form_questions = modified_workflow.get("microsoft_forms", {}).get("questions", [])
-        approver_emails = [q for q in form_questions if "email" in q.get("field_name", "")]
-        if len(approver_emails) != len(approval_chain):
+        approver_emails = sum(1 for q in form_questions if "email" in q.get("field_name", ""))
+        if approver_emails != len(approval_chain):
             issues.append("Form approver fields don't match approval chain")
         
+        # Check form question ids are unique (added fields take one past the highest qN in use, but
+        # LLM-written or hand-edited forms can still repeat an id)
+        seen_ids = set()
+        for q in form_questions:
+            qid = q.get("id")
+            if qid in seen_ids:
+                issues.append(f"Duplicate form question id: {qid}")
+                break
+            seen_ids.add(qid)
+        
         validation_result = {
             "valid": len(issues) == 0,
             "issues": issues
@@ -630,43 +1136,30 @@ Return ONLY valid JSON:
         print(f"[CHANGES] {len(changes_applied)}")
         
         # Save to file
-        workflows_dir = os.path.join(os.path.dirname(__file__), 'workflows')
-        os.makedirs(workflows_dir, exist_ok=True)
-        filepath = os.path.join(workflows_dir, f"{chat_id}.json")
+        os.makedirs(WORKFLOWS_DIR, exist_ok=True)
+        filepath = os.path.join(WORKFLOWS_DIR, f"{chat_id}.json")
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump(modified_workflow, f, indent=2)
+            # Serialize once; the same bytes go to the file and, compressed, to the state table.
+            # Compact by default, AKIRA_PRETTY=1 indents them for debugging
+            pretty = bool(os.getenv("AKIRA_PRETTY"))
+            if orjson is not None:
+                workflow_bytes = orjson.dumps(modified_workflow, option=orjson.OPT_INDENT_2 if pretty else None)
+            else:
+                workflow_bytes = json.dumps(modified_workflow, indent=2 if pretty else None,
+                                            separators=None if pretty else (",", ":")).encode("utf-8")
+            with open(filepath, 'wb') as f:
+                f.write(workflow_bytes)
             print(f"\n[SAVE] Modified workflow saved to: {filepath}")
             
-            # Database logging
-            try:
-                db_path = os.path.join(os.path.dirname(__file__), 'database')
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                
-                workflow_json = json.dumps(modified_workflow)
-                
-                # Get latest version
-                cursor.execute("SELECT MAX(CAST(version AS INTEGER)) FROM state WHERE chatid = ?", (chat_id,))
-                max_version_row = cursor.fetchone()
-                
-                new_version = 1
-                if max_version_row and max_version_row[0] is not None:
-                    new_version = max_version_row[0] + 1
-                
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                cursor.execute('''
-                    INSERT INTO state (chatid, workflow, version, timestamp)
-                    VALUES (?, ?, ?, ?)
-                ''', (chat_id, workflow_json, str(new_version), timestamp))
-                
-                conn.commit()
-                conn.close()
-                print(f"[DB] Workflow logged (v{new_version}) for chat_id: {chat_id}")
-            except Exception as db_e:
-                print(f"[ERROR] Failed to log to database: {db_e}")
+            # The input snapshot is no longer needed once the result is on disk
+            workflow_ref = state.get("workflow_ref")
+            if workflow_ref and os.path.exists(workflow_ref):
+                os.remove(workflow_ref)
+            
+            # Logged before the result is reported, so the version endpoints already see it
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._log_workflow_version(chat_id, workflow_bytes, timestamp)
                 
         except Exception as e:
             print(f"[ERROR] Failed to save JSON: {e}")
@@ -675,10 +1168,29 @@ Return ONLY valid JSON:
         
         changes_summary = "\n".join([f"- {c}" for c in changes_applied])
         
+        # Saved above; keep the final checkpoint small
         return {
+            "modified_workflow": {},
             "last_message": f"Workflow Modification Complete!\n\nName: {workflow_name}\nVersion: {metadata.get('version')}\n\nChanges Applied:\n{changes_summary}\n\nModified workflow saved successfully."
         }
 
+    def _log_workflow_version(self, chat_id, workflow_bytes, timestamp):
+        """
+        Compress and append the modified workflow as the chat's next state version
+        """
+        try:
+            workflow_blob = encode_workflow_json(workflow_bytes)
+            
+            with self._db_lock, self._db:
+                new_version = self._db.execute(Q_INSERT_NEXT_VERSION, {
+                    "chatid": chat_id,
+                    "workflow": workflow_blob,
+                    "timestamp": timestamp
+                }).fetchone()[0]
+            print(f"[DB] Workflow logged (v{new_version}) for chat_id: {chat_id}")
+        except Exception as db_e:
+            print(f"[ERROR] Failed to log to database: {db_e}")
+
     # Helper modification methods (same as before but included for completeness)
     def _modify_approval_chain(self, workflow, action, details):
         """Modify approval chain"""
@@ -698,15 +1210,15 @@ Return ONLY valid JSON:
             }
             chain.insert(new_level - 1, new_approver)
             # Renumber levels
-            for idx, a in enumerate(chain, 1):
-                a["level"] = idx
+            _renumber(chain, "level")
             
             # Add corresponding form fields
             role_field = new_approver["approver_role"].replace(" ", "_").lower()
             form_qs = workflow.get("microsoft_forms", {}).get("questions", [])
+            next_id = _next_question_number(form_qs)
             form_qs.extend([
                 {
-                    "id": f"q{len(form_qs)+1}",
+                    "id": f"q{next_id}",
                     "field_name": f"{role_field}_name",
                     "type": "text",
                     "title": f"{new_approver['approver_role']} Name",
@@ -714,7 +1226,7 @@ Return ONLY valid JSON:
                     "purpose": "approver_identification"
                 },
                 {
-                    "id": f"q{len(form_qs)+2}",
+                    "id": f"q{next_id + 1}",
                     "field_name": f"{role_field}_email",
                     "type": "email",
                     "title": f"{new_approver['approver_role']} Email",
@@ -725,10 +1237,9 @@ Return ONLY valid JSON:
             
         elif action == "remove":
             level = details.get("level")
-            chain = [a for a in chain if a["level"] != level]
-            # Renumber levels
-            for idx, a in enumerate(chain, 1):
-                a["level"] = idx
+            if not any(a.get("level") == level for a in chain):
+                raise ValueError(f"no approver at level {level}")
+            chain = _drop_and_renumber(chain, "level", level)
             workflow["workflow_analysis"]["approval_chain"] = chain
             
         elif action == "modify":
@@ -742,16 +1253,20 @@ Return ONLY valid JSON:
                     if "rejection_behavior" in details:
                         approver["rejection_behavior"] = details["rejection_behavior"]
                     break
+            else:
+                raise ValueError(f"no approver at level {level}")
+        else:
+            raise ValueError(f"unsupported action: {action}")
         
         return workflow
 
     def _modify_form_schema(self, workflow, action, details):
         """Modify form schema"""
-        qs = workflow.get("microsoft_forms", {}).get("questions", [])
+        qs = workflow.setdefault("microsoft_forms", {}).setdefault("questions", [])
         
         if action == "add":
             qs.append({
-                "id": f"q{len(qs)+1}",
+                "id": f"q{_next_question_number(qs)}",
                 "field_name": details.get("field_name", "new_field"),
                 "type": details.get("type", "text"),
                 "title": details.get("title", "New Field"),
@@ -759,15 +1274,19 @@ Return ONLY valid JSON:
                 "purpose": details.get("purpose", "general")
             })
         elif action == "remove":
-            field_name = details.get("field_name")
-            qs = [q for q in qs if q.get("field_name") != field_name]
-            workflow["microsoft_forms"]["questions"] = qs
+            to_drop = _names_to_drop(details, "field_name")
+            count = len(qs)
+            qs[:] = [q for q in qs if q.get("field_name") not in to_drop]
+            if len(qs) == count:
+                raise ValueError(f"no form field named {', '.join(map(str, to_drop))}")
+        else:
+            raise ValueError(f"unsupported action: {action}")
             
         return workflow
 
     def _modify_excel_schema(self, workflow, action, details):
         """Modify excel schema"""
-        cols = workflow.get("excel_tracker", {}).get("columns", [])
+        cols = workflow.setdefault("excel_tracker", {}).setdefault("columns", [])
         
         if action == "add":
             cols.append({
@@ -776,9 +1295,13 @@ Return ONLY valid JSON:
                 "source": details.get("source", "form_field")
             })
         elif action == "remove":
-            col_name = details.get("name")
-            cols = [c for c in cols if c.get("name") != col_name]
-            workflow["excel_tracker"]["columns"] = cols
+            to_drop = _names_to_drop(details, "name")
+            count = len(cols)
+            cols[:] = [c for c in cols if c.get("name") not in to_drop]
+            if len(cols) == count:
+                raise ValueError(f"no excel column named {', '.join(map(str, to_drop))}")
+        else:
+            raise ValueError(f"unsupported action: {action}")
             
         return workflow
 
@@ -796,15 +1319,15 @@ Return ONLY valid JSON:
             }
             steps.insert(position - 1, new_step)
             # Renumber steps
-            for idx, s in enumerate(steps, 1):
-                s["step_number"] = idx
+            _renumber(steps, "step_number")
         elif action == "remove":
             step_number = details.get("step_number")
-            steps = [s for s in steps if s.get("step_number") != step_number]
-            # Renumber steps
-            for idx, s in enumerate(steps, 1):
-                s["step_number"] = idx
+            if not any(s.get("step_number") == step_number for s in steps):
+                raise ValueError(f"no workflow step {step_number}")
+            steps = _drop_and_renumber(steps, "step_number", step_number)
             workflow["power_automate_workflow"]["steps"] = steps
+        else:
+            raise ValueError(f"unsupported action: {action}")
             
         return workflow
 
@@ -819,28 +1342,30 @@ Return ONLY valid JSON:
                 "platform": details.get("platform", "Outlook"),
                 "template": details.get("template", "notification")
             })
+        else:
+            raise ValueError(f"unsupported action: {action}")
             
         return workflow
 
     def _increment_version(self, version):
-        """Increment version number"""
-        parts = str(version).split(".")
-        if len(parts) >= 2:
-            parts[-1] = str(int(parts[-1]) + 1)
-            return ".".join(parts)
+        """Increment version number; a pre-release suffix like "-rc1" is dropped"""
+        m = _VERSION_RE.match(str(version))
+        if m:
+            return f"{m['prefix']}{int(m['last']) + 1}"
         return f"{version}.1"
 
-    def _check_batch_status(self, state: ModificationState) -> str:
+    def _route_after_analysis(self, state: ModificationState) -> str:
         """
-        Check if current batch of questions is complete
+        After the join: ask the speculative batch, regenerate it with the analysis, or skip questions
+        Skipping goes straight to apply_modifications when the analysis call already returned a plan
         """
-        questions = state.get("clarifying_questions", [])
-        index = state.get("current_question_index", 0)
-        
-        if index < len(questions):
-            return "next_question"
-        else:
-            return "batch_done"
+        if not state.get("analysis", {}).get("requires_clarification", True):
+            if "changes" in state.get("modification_plan", {}):
+                return "apply"
+            return "plan"
+        if state.get("clarifying_questions"):
+            return "ask"
+        return "regenerate"
 
     def _should_ask_more_questions(self, state: ModificationState) -> str:
         """
@@ -867,8 +1392,7 @@ Return ONLY valid JSON:
         iteration = state.get("question_iteration", 0)
         return {
             "question_iteration": iteration + 1,
-            "clarifying_questions": [], # Clear old batch
-            "current_question_index": 0  # Reset index for new batch
+            "clarifying_questions": []  # Clear old batch
         }
 
     def _build_graph(self):
@@ -878,7 +1402,9 @@ Return ONLY valid JSON:
         graph = StateGraph(ModificationState)
         
         # Add nodes
-        graph.add_node("analyze_request", self._analyze_modification_request)
+        graph.add_node("analyze_and_plan", self._analyze_and_plan)
+        graph.add_node("speculative_questions", self._generate_speculative_questions)
+        graph.add_node("join_analysis", self._join_analysis)
         graph.add_node("generate_questions", self._generate_clarifying_questions)
         graph.add_node("collect_answers", self._collect_user_answers)
         graph.add_node("validate_answers", self._validate_user_answers)
@@ -888,19 +1414,24 @@ Return ONLY valid JSON:
         graph.add_node("display", self._display_results)
         
         # Define flow
-        graph.set_entry_point("analyze_request")
-        graph.add_edge("analyze_request", "generate_questions")
-        graph.add_edge("generate_questions", "collect_answers")
-        
-        # Per-question loop - like agent.py
+        # Analysis and the first question batch only need the request, so they run in parallel
+        graph.add_edge(START, "analyze_and_plan")
+        graph.add_edge(START, "speculative_questions")
+        graph.add_edge(["analyze_and_plan", "speculative_questions"], "join_analysis")
         graph.add_conditional_edges(
-            "collect_answers",
-            self._check_batch_status,
+            "join_analysis",
+            self._route_after_analysis,
             {
-                "next_question": "generate_questions",
-                "batch_done": "validate_answers"
+                "ask": "collect_answers",
+                "regenerate": "generate_questions",
+                "plan": "create_plan",
+                "apply": "apply_modifications"
             }
         )
+        graph.add_edge("generate_questions", "collect_answers")
+        
+        # One interrupt per batch: the reply carries every answer
+        graph.add_edge("collect_answers", "validate_answers")
         
         # Conditional: ask more (new batch) or proceed - like agent.py
         graph.add_node("increment_iteration", self._increment_question_iteration)
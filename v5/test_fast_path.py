@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+# mod_agent imports its siblings (workflow_codec) as top-level modules, like app.py does
+sys.path.insert(0, os.path.dirname(__file__))
+mod_agent = pytest.importorskip("mod_agent")
+_match_fast_path = mod_agent._match_fast_path
+
+
+@pytest.mark.parametrize("request_text", [
+    "add an approver",
+    "add a approver",
+    "add the approver at level 1",
+    "add my approver",
+    "add your approver",
+    "add this approver",
+    "add some approver",
+    "add an additional approver",
+    "add a second approver at level 2",
+    "add a 3rd approver",
+    "add a new finance approver",
+])
+def test_add_approver_without_a_role_goes_to_the_model(request_text):
+    assert _match_fast_path(request_text) is None
+
+
+@pytest.mark.parametrize("request_text, role, level", [
+    ("add a finance manager approver at level 2", "Finance Manager", 2),
+    ("Add a Finance Manager approver", "Finance Manager", None),
+    ("add the legal approver", "Legal", None),
+    ("add an HR approver as level 1", "HR", 1),
+])
+def test_add_approver_role_is_title_cased(request_text, role, level):
+    modification_type, component, action, details = _match_fast_path(request_text)
+    assert (modification_type, component, action) == ("add_approver", "approval_chain", "add")
+    assert details.get("role") == role
+    assert details.get("level") == level
+
+
+@pytest.mark.parametrize("request_text", [
+    "remove field budget if amount is small",
+    "add a Finance Manager approver and remove level 1 approver",
+    "add a CFO approver, then notify HR",
+    "change the timeout",
+])
+def test_clauses_and_compound_requests_go_to_the_model(request_text):
+    assert _match_fast_path(request_text) is None
+
+
+def test_removals_capture_single_targets():
+    assert _match_fast_path("Remove level 2 approver") == ("remove_approver", "approval_chain", "remove", {"level": 2})
+    assert _match_fast_path("delete field Department") == ("other", "form_schema", "remove", {"field_name": "Department"})
+    assert _match_fast_path("remove the form field 'Cost Center'")[3] == {"field_name": "Cost Center"}
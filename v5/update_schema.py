@@ -10,5 +10,10 @@ try:
 except sqlite3.OperationalError as e:
     print(f"Operation failed (column might already exist): {e}")
 
+# Databases created before init_db.py added the indexes don't have them yet
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_chatlog_chatid ON chatlog(chatid);")
+cursor.execute("CREATE INDEX IF NOT EXISTS idx_state_chatid_version ON state(chatid, CAST(version AS INTEGER));")
+print("Indexes 'idx_chatlog_chatid' and 'idx_state_chatid_version' ensured.")
+
 conn.commit()
 conn.close()
@@ -1,5 +1,23 @@
 import sqlite3
 import os
+import sys
+from workflow_codec import workflow_text
+
+# Cells are shown on one line
+_NEWLINES = str.maketrans({"\n": " "})
+
+def _cell(item):
+    if isinstance(item, bytes):
+        # state.workflow holds compressed JSON; other BLOBs (checkpoints) are shown raw
+        try:
+            item = workflow_text(item)
+        except Exception:
+            pass
+    # Truncate long messages for readability
+    val = str(item).translate(_NEWLINES)
+    if len(val) > 50:
+        val = val[:47] + "..."
+    return f"{val:<20}"
 
 def view_database():
     db_path = os.path.join(os.path.dirname(__file__), 'database')
@@ -9,6 +27,12 @@ def view_database():
         return
 
     conn = sqlite3.connect(db_path)
+    # Read-only full-table dump: map the file, keep sort scratch in memory, use a 64 MiB page cache
+    conn.executescript("""
+        PRAGMA mmap_size=268435456;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+    """)
     cursor = conn.cursor()
 
     # Get list of tables
@@ -22,9 +46,7 @@ def view_database():
 
     for table_name in tables:
         table_name = table_name[0]
-        print(f"\n{'='*80}")
-        print(f" TABLE: {table_name}")
-        print(f"{'='*80}")
+        lines = [f"\n{'='*80}", f" TABLE: {table_name}", f"{'='*80}"]
 
         # Get column names
         cursor.execute(f"PRAGMA table_info({table_name});")
@@ -32,22 +54,25 @@ def view_database():
         
         # Print headers
         header_fmt = " | ".join([f"{col:<20}" for col in columns])
-        print(header_fmt)
-        print("-" * len(header_fmt))
+        lines.append(header_fmt)
+        lines.append("-" * len(header_fmt))
 
-        # Get rows
-        cursor.execute(f"SELECT * FROM {table_name} ORDER BY chatid, timestamp;")
-        rows = cursor.fetchall()
-        
-        for row in rows:
-            row_str = []
-            for item in row:
-                # Truncate long messages for readability
-                val = str(item).replace('\n', ' ')
-                if len(val) > 50:
-                    val = val[:47] + "..."
-                row_str.append(f"{val:<20}")
-            print(" | ".join(row_str))
+        # Get rows. Rows are appended in time order, so rowid orders them like timestamp
+        # does, and for chatlog the chatid index already returns them that way (no sort).
+        # The modification agent's checkpoint and cache tables have no chatid column
+        order_by = "chatid, rowid" if "chatid" in columns else "rowid"
+        cursor.execute(f"SELECT * FROM {table_name} ORDER BY {order_by};")
+        # Fetch in bounded batches and write each one at once, instead of one print per row
+        # or holding the whole table in memory
+        while True:
+            batch = cursor.fetchmany(1024)
+            if not batch:
+                break
+            lines.extend(" | ".join([_cell(item) for item in row]) for row in batch)
+            sys.stdout.write("\n".join(lines) + "\n")
+            lines = []
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
 
     conn.close()
 
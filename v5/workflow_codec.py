@@ -0,0 +1,53 @@
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib json module
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: new rows are gzip-compressed instead
+    zstandard = None
+
+# Workflows in the state table are stored as compressed JSON BLOBs: zstd (level 3)
+# when zstandard is installed, gzip otherwise. Reads detect the format from the
+# frame magic, so rows written either way stay readable.
+# Rows written before compression was introduced are plain TEXT and are read as-is.
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+def encode_workflow(workflow):
+    if orjson is not None:
+        return encode_workflow_json(orjson.dumps(workflow))
+    return encode_workflow_json(json.dumps(workflow).encode("utf-8"))
+
+def encode_workflow_json(data):
+    # For callers that already hold the serialized workflow bytes
+    if zstandard is not None:
+        return _zstd_compressor.compress(data)
+    return gzip.compress(data, compresslevel=1)
+
+def decompress_workflow_json(blob):
+    # Inverse of encode_workflow_json: compressed bytes back to JSON bytes
+    if blob[:4] == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("workflow is zstd-compressed but zstandard is not installed")
+        # max_output_size covers frames written without a content size
+        return _zstd_decompressor.decompress(blob, max_output_size=64 * len(blob) + (1 << 20))
+    return gzip.decompress(blob)
+
+def workflow_text(raw):
+    if isinstance(raw, bytes):
+        return decompress_workflow_json(raw).decode("utf-8")
+    return raw
+
+def decode_workflow(raw):
+    if orjson is not None:
+        return orjson.loads(decompress_workflow_json(raw) if isinstance(raw, bytes) else raw)
+    return json.loads(workflow_text(raw))